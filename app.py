@@ -1,42 +1,89 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_from_directory, abort, jsonify
+from flask import (Flask, render_template, request, redirect, url_for, session, flash, send_file, abort, jsonify,
+                   send_from_directory, Response)
+from werkzeug.security import safe_join
+from werkzeug.middleware.proxy_fix import ProxyFix
+from urllib.parse import quote, urlencode
 import os
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+import re
+import hashlib
+import mimetypes
+import uuid
+import shutil
+import time
+from sqlalchemy import func, select, and_, or_, tuple_
+from sqlalchemy.orm import joinedload, contains_eager
+from datetime import datetime, date
 from chatbot import ClubChatbot
+from logging_config import configure_logging, logging_stats, SAMPLED
+from profiler import (init_profiling, instrument_engine, span, background_folded, list_captures,
+                      profiler_stats, CAPTURE_NAME)
+from rate_limit import TokenBucketLimiter, SingleFlight, create_store
+from database import (is_sqlite_file_url, sqlite_engine_options, configure_sqlite_engine, mark_write_intent,
+                      normalize_database_url, server_engine_options, REPLICA_BIND_KEY, read_only_route,
+                      RoutingSession, PRIMARY_ONLY_ENVIRON, read_primary)
+from models import db, Club, ClubMember, ClubGalleryImage, Event
+from migrations import upgrade as upgrade_schema
+from static_export import StaticExporter, pages_for_change
+from cache import create_cache, Uncacheable
+from uploads import ImageUploads, UploadRejected
+from live import LiveBroker
+from autocomplete import CatalogAutocomplete
+from changes import ChangeLog, member_payload
+from health import HealthMonitor, CheckDisabled
+from transcripts import TranscriptSink
+from read_models import ClubCard, DashboardClub, EventCard, EventSummary, DashboardEvent, MemberCard
 import logging
-import sys
-import json
 
 app = Flask(__name__)
 
-# Enhanced logging configuration
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s %(levelname)s: %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+# Structured, queue-based logging (see logging_config.py)
+configure_logging(app)
 logger = logging.getLogger(__name__)
 
 # Configuration
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
+# Number of proxies in front of the app whose X-Forwarded-For we trust
+# (Render's router is one); client IPs feed the per-IP rate limits
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 1))
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
+
 # Database configuration
-database_url = os.environ.get('DATABASE_URL')
+database_url = normalize_database_url(os.environ.get('DATABASE_URL'))
 if database_url:
-    if database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///clubs.db'
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-}
+if is_sqlite_file_url(app.config['SQLALCHEMY_DATABASE_URI']):
+    # WAL journaling, pragmas and a sized pool; see database.py
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options()
+else:
+    # Sized with DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = server_engine_options('DB')
+
+# Optional read replica for public read-only routes, sized independently
+# with the DB_REPLICA_* pool variables
+replica_url = normalize_database_url(os.environ.get('DATABASE_REPLICA_URL'))
+if replica_url:
+    replica_options = sqlite_engine_options() if is_sqlite_file_url(replica_url) else server_engine_options('DB_REPLICA')
+    app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND_KEY: {'url': replica_url, **replica_options}}
+
+# Initialize database (models live in models.py)
+db.init_app(app)
 
-# Initialize database
-db = SQLAlchemy(app)
+with app.app_context():
+    for engine in db.engines.values():
+        if is_sqlite_file_url(engine.url):
+            configure_sqlite_engine(engine)
+        instrument_engine(engine)
+
+# Span timings, background stack sampling and manager-triggered captures
+# (X-Profile: 1 or ?_profile=1); see profiler.py
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+init_profiling(app, PROFILE_DIR)
 
 # Initialize chatbot with token from environment
 chatbot = None
@@ -53,73 +100,12 @@ def init_chatbot():
         logger.info("✓ Hugging Face token found")
     
     try:
-        chatbot = ClubChatbot(hf_token=hf_token)
+        chatbot = ClubChatbot(hf_token=hf_token, cache=cache)
         logger.info("✓ Chatbot initialized successfully")
     except Exception as e:
         logger.error(f"✗ Error initializing chatbot: {str(e)}")
         chatbot = None
 
-# ==================== DATABASE MODELS ====================
-
-class Club(db.Model):
-    __tablename__ = 'clubs'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), unique=True, nullable=False)
-    logo_url = db.Column(db.String(200), nullable=True)
-    members_count = db.Column(db.Integer, default=0)
-    description = db.Column(db.Text, nullable=True)
-    is_recruiting = db.Column(db.Boolean, default=False)
-    application_link = db.Column(db.String(300), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    members = db.relationship('ClubMember', backref='club', lazy='dynamic', cascade='all, delete-orphan')
-    
-    def __repr__(self):
-        return f'<Club {self.name}>'
-    
-    def to_dict(self):
-        """Safe dictionary conversion with defaults"""
-        return {
-            'id': self.id,
-            'name': self.name or 'Unnamed Club',
-            'logo_url': self.logo_url or '',
-            'members_count': self.members_count or 0,
-            'description': self.description or 'No description available.',
-            'is_recruiting': bool(self.is_recruiting),
-            'application_link': self.application_link or ''
-        }
-
-class ClubMember(db.Model):
-    __tablename__ = 'club_members'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    role = db.Column(db.String(100), nullable=False)
-    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=False)
-    joined_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def __repr__(self):
-        return f'<ClubMember {self.name} - {self.role}>'
-
-class Event(db.Model):
-    __tablename__ = 'events'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(200), nullable=False)
-    description = db.Column(db.Text, nullable=False)
-    category = db.Column(db.String(50), nullable=False)
-    date = db.Column(db.String(50), nullable=False)
-    time = db.Column(db.String(50), nullable=False)
-    location = db.Column(db.String(200), nullable=False)
-    organizer = db.Column(db.String(100), nullable=False)
-    image_url = db.Column(db.String(200), nullable=True)
-    size_class = db.Column(db.String(20), default='size-medium')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def __repr__(self):
-        return f'<Event {self.title}>'
-
 # Manager credentials
 MANAGER_CREDENTIALS = {
     'username': os.environ.get('MANAGER_USERNAME', 'admin'),
@@ -167,23 +153,259 @@ def get_available_images():
     
     return sorted(images)
 
-# Custom Jinja filter to parse JSON
-@app.template_filter('from_json')
-def from_json_filter(value):
-    """Convert JSON string to Python object"""
-    if not value:
-        return []
+@app.template_global()
+def image_url(filename):
+    """URL for a club image: templates/images when the file is there, static/images otherwise"""
+    if os.path.isfile(os.path.join(app.root_path, 'templates', 'images', filename)):
+        return url_for('serve_template_image', filename=filename)
+    return url_for('static', filename='images/' + filename)
+
+# Number of gallery images rendered with the page; the rest load on demand
+GALLERY_PAGE_SIZE = 6
+
+# Page size limits for /api/events
+EVENTS_API_DEFAULT_LIMIT = 20
+EVENTS_API_MAX_LIMIT = 100
+
+def parse_iso_date(value):
+    """Parse YYYY-MM-DD, returning None for missing or invalid input"""
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+def get_event_filters(args):
+    """Category, organizer and date-window filters from query parameters"""
+    return {
+        'category': args.get('category', '').strip() or None,
+        'organizer': args.get('organizer', '').strip() or None,
+        'date_from': parse_iso_date(args.get('from')),
+        'date_to': parse_iso_date(args.get('to')),
+    }
+
+def filter_events(query, filters, exclude=None):
+    """Apply event filters, optionally leaving one out for that facet's own counts"""
+    if filters['category'] and exclude != 'category':
+        query = query.filter(Event.category == filters['category'])
+    if filters['organizer'] and exclude != 'organizer':
+        query = query.filter(Event.organizer == filters['organizer'])
+    if filters['date_from']:
+        query = query.filter(Event.starts_on >= filters['date_from'])
+    if filters['date_to']:
+        query = query.filter(Event.starts_on <= filters['date_to'])
+    return query
+
+def get_events_page(args):
+    """Clamped limit and offset of an /api/events request"""
+    limit = min(max(args.get('limit', EVENTS_API_DEFAULT_LIMIT, type=int), 1), EVENTS_API_MAX_LIMIT)
+    offset = max(args.get('offset', 0, type=int), 0)
+    return limit, offset
+
+def event_filters_key(filters):
+    """Canonical query string of parsed event filters; unknown or invalid parameters drop out"""
+    return urlencode([(name, value.isoformat() if isinstance(value, date) else value)
+                      for name, value in filters.items() if value])
+
+def get_event_facets(filters):
+    """Grouped counts per category and organizer, each honouring the other filters"""
+    facets = {}
+    for name, column in (('category', Event.category), ('organizer', Event.organizer)):
+        count = func.count(Event.id)
+        rows = (filter_events(db.session.query(column, count), filters, exclude=name)
+                .group_by(column)
+                .order_by(count.desc(), column)
+                .all())
+        facets[name] = [{'value': value, 'count': total} for value, total in rows]
+    return facets
+
+def get_club_with_upcoming_events(club_id):
+    """One query for a club, its "why join" reasons and its upcoming events;
+    only the events matched by the join populate club.events"""
+    return db.session.execute(
+        select(Club)
+        .outerjoin(Event, and_(Event.organizer_club_id == Club.id, Event.starts_on >= date.today()))
+        .options(contains_eager(Club.events), joinedload(Club.why_join_reasons))
+        .where(Club.id == club_id)
+        .order_by(Event.starts_on, Event.id)
+        .execution_options(populate_existing=True)
+    ).unique().scalar_one_or_none()
+
+def first_gallery_page(club):
+    """The club's first GALLERY_PAGE_SIZE images and whether /api/club/<id>/gallery has more"""
+    gallery = club.gallery_images.limit(GALLERY_PAGE_SIZE + 1).all()
+    return gallery[:GALLERY_PAGE_SIZE], len(gallery) > GALLERY_PAGE_SIZE
+
+# ==================== CACHE ====================
+
+# Shared by the workers on the host by default (CACHE_URL, see cache.py).
+# Committed changes invalidate the tags they touch: club:<id>, clubs and
+# events, the same keys the static export uses for pages.
+cache = create_cache(os.environ.get('CACHE_URL') or f"sqlite:///{os.path.join(app.instance_path, 'cache.db')}",
+                     default_ttl=int(os.environ.get('CACHE_DEFAULT_TTL', 300)))
+cache.install_hooks(RoutingSession, pages_for_change)
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+
+def cached_page(tags, variant=None):
+    """Serve a public GET view from the cache; ``tags(**view_args)`` lists what its output depends on.
+
+    The cache key is the path plus ``variant()``, the query parameters the
+    view actually reads in canonical form, so junk or reordered parameters
+    share one entry. Only 200 responses are stored: views answer 5xx when
+    their database read fails. A miss renders from the primary even under
+    read_only_route: a lagging replica read right after an invalidation
+    would be stored as fresh for PAGE_CACHE_TTL."""
+    from functools import wraps
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.environ.get(PRIMARY_ONLY_ENVIRON):
+                # Static export renders must come from the database itself
+                return fn(*args, **kwargs)
+            
+            def render():
+                with read_primary():
+                    response = app.make_response(fn(*args, **kwargs))
+                page = {'status': response.status_code, 'mimetype': response.mimetype,
+                        'location': response.headers.get('Location'), 'body': response.get_data(as_text=True)}
+                if response.status_code != 200:
+                    raise Uncacheable(page)
+                return page
+            
+            key = f"page:{request.path}?{variant() if variant else ''}"
+            page = cache.get_or_set(key, render, tags=tags(**kwargs), ttl=PAGE_CACHE_TTL)
+            response = Response(page['body'], status=page['status'], mimetype=page['mimetype'])
+            if page['location']:
+                response.headers['Location'] = page['location']
+            return response
+        return wrapper
+    return decorator
+
+# ==================== STATIC EXPORT ====================
+
+# Public pages rendered to files for the front proxy (see static_export.py);
+# with STATIC_EXPORT_DIR set, every committed change re-exports what it touched
+STATIC_EXPORT_DIR = os.environ.get('STATIC_EXPORT_DIR') or os.path.join(app.instance_path, 'public')
+static_exporter = None
+if os.environ.get('STATIC_EXPORT_DIR'):
+    static_exporter = StaticExporter(app, STATIC_EXPORT_DIR, GALLERY_PAGE_SIZE)
+    static_exporter.install_hooks(RoutingSession)
+
+# ==================== LIVE UPDATES ====================
+
+# Manager changes are pushed to open pages over Server-Sent Events (see
+# live.py). Each open stream holds one gthread worker thread, mostly idle
+# in a queue wait, for at most LIVE_STREAM_SECONDS. Sizing rule: a worker
+# runs GUNICORN_THREADS threads (Procfile) and keeps LIVE_RESERVED_THREADS
+# of them for ordinary requests; the rest may hold streams. Past the cap,
+# pages are told to retry later and keep working without live updates.
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 64))
+LIVE_RESERVED_THREADS = int(os.environ.get('LIVE_RESERVED_THREADS', 16))
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_MAX_SUBSCRIBERS',
+                                          max(GUNICORN_THREADS - LIVE_RESERVED_THREADS, 1)))
+live_broker = LiveBroker(
+    app, db,
+    poll_interval=float(os.environ.get('LIVE_POLL_INTERVAL', 1.0)),
+    retention=int(os.environ.get('LIVE_RETENTION_SECONDS', 600)),
+    max_subscribers=LIVE_MAX_SUBSCRIBERS,
+    stream_seconds=int(os.environ.get('LIVE_STREAM_SECONDS', 300))
+)
+# Public topics carry only what the public pages show; dashboard rows and
+# totals go out on the manager topic, streamed from /manager/live
+LIVE_TOPICS = {'events', 'clubs'}
+MANAGER_LIVE_TOPIC = 'manager'
+
+def get_dashboard_totals():
+    return {
+        'clubs': db.session.scalar(select(func.count(Club.id))),
+        'members': db.session.scalar(select(func.coalesce(func.sum(Club.members_count), 0))),
+        'events': db.session.scalar(select(func.count(Event.id)))
+    }
+
+def publish_event_change(kind, event):
+    """Announce a created/updated/deleted event; sent when the session commits"""
+    payload = {'type': f'event.{kind}', 'id': event.id}
+    dashboard = dict(payload)
+    if kind != 'deleted':
+        payload['event'] = {**event.to_dict(), 'description': event.description}
+        payload['html'] = {'brick': render_template('_event_brick.html', event=event)}
+        dashboard['html'] = {'dashboard_row': render_template('_dashboard_event_row.html', event=event)}
+    if kind != 'updated':
+        dashboard['totals'] = get_dashboard_totals()
+    live_broker.publish(db.session, 'events', payload)
+    live_broker.publish(db.session, MANAGER_LIVE_TOPIC, dashboard)
+
+def publish_club_change(kind, club):
+    """Announce a created/updated/deleted club; sent when the session commits"""
+    payload = {'type': f'club.{kind}', 'id': club.id}
+    dashboard = {**payload, 'totals': get_dashboard_totals()}
+    if kind != 'deleted':
+        payload['html'] = {'recruiting_status': render_template('_recruiting_status.html', club=club)}
+        dashboard['html'] = {'dashboard_row': render_template('_dashboard_club_row.html', club=club)}
+    live_broker.publish(db.session, 'clubs', payload)
+    live_broker.publish(db.session, MANAGER_LIVE_TOPIC, dashboard)
+
+def publish_member_change(club_id):
+    """Announce a new team grid for a club after a member was added, edited or removed"""
+    members = ClubMember.query.filter_by(club_id=club_id).limit(4).all()
+    live_broker.publish(db.session, 'clubs', {
+        'type': 'member.changed',
+        'club_id': club_id,
+        'html': {'team_grid': render_template('_team_grid.html', members=members)}
+    })
+
+def live_response(topics):
+    """Server-Sent Events stream of ``topics``, resuming after Last-Event-ID"""
+    if not topics:
+        return jsonify({'error': 'Unknown topics'}), 400
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
     try:
-        return json.loads(value)
-    except:
-        return []
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    subscriber = live_broker.subscribe(topics, last_event_id)
+    if subscriber is None:
+        # EventSource gives up for good on an error status, so ask it to come back later
+        return Response('retry: 30000\n\n', mimetype='text/event-stream', headers=headers)
+    return Response(live_broker.stream(subscriber), mimetype='text/event-stream', headers=headers)
+
+@app.route('/api/live')
+def live_updates():
+    return live_response(LIVE_TOPICS.intersection(request.args.get('topics', '').split(',')))
+
+# ==================== CHANGE FEED ====================
+
+# Every committed change to clubs, members and events is logged with a
+# monotonic version (see changes.py); clients sync with /api/changes?since=
+change_log = ChangeLog(
+    app,
+    retention_days=int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 30)),
+    compact_interval=int(os.environ.get('CHANGE_LOG_COMPACT_INTERVAL', 3600))
+)
+change_log.install_hooks(RoutingSession)
+
+@app.route('/api/changes')
+@read_only_route
+def changes_feed():
+    """Rows changed after ?since=<version>; page with the returned version while has_more"""
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({'error': 'since must be a version number'}), 400
+    limit = min(max(request.args.get('limit', 500, type=int), 1), 1000)
+    try:
+        return jsonify(change_log.changes_since(db.session, since, limit)), 200
+    except Exception as e:
+        logger.error(f"Error in changes_feed: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Error loading changes'}), 500
 
 # ==================== INITIALIZATION ====================
 
 def init_db():
     with app.app_context():
         try:
-            db.create_all()
+            # Create new tables and apply pending schema migrations
+            upgrade_schema(db)
             logger.info("Database tables created successfully")
             
             # Seed clubs if empty
@@ -246,8 +468,10 @@ def init_db():
                     }
                 ]
                 
+                # Link each event to its organizing club by name
+                club_ids = {club.name: club.id for club in Club.query.all()}
                 for event_data in events_data:
-                    event = Event(**event_data)
+                    event = Event(**event_data, organizer_club_id=club_ids.get(event_data['organizer']))
                     db.session.add(event)
                 
                 db.session.commit()
@@ -295,42 +519,94 @@ def about():
     return render_template('about.html')
 
 @app.route('/events')
+@read_only_route
+@cached_page(lambda: ['events'], lambda: event_filters_key(get_event_filters(request.args)))
 def events():
+    filters = get_event_filters(request.args)
     try:
-        events_list = Event.query.order_by(Event.created_at.desc()).all()
-        logger.info(f"Fetched {len(events_list)} events")
-        return render_template('events.html', events=events_list)
+        events_list = EventCard.all(filter_events(EventCard.query(), filters).order_by(Event.created_at.desc()))
+        facets = get_event_facets(filters)
+        logger.info(f"Fetched {len(events_list)} events", extra=SAMPLED)
+        return render_template('events.html', events=events_list, facets=facets, filters=filters)
     except Exception as e:
         logger.error(f"Error in events route: {str(e)}", exc_info=True)
         flash('Error loading events', 'error')
-        return render_template('events.html', events=[])
+        return render_template('events.html', events=[], facets={'category': [], 'organizer': []}, filters=filters), 500
+
+@app.route('/api/events')
+@read_only_route
+@cached_page(lambda: ['events'],
+             lambda: '{}&limit={}&offset={}'.format(event_filters_key(get_event_filters(request.args)),
+                                                   *get_events_page(request.args)))
+def events_api():
+    """Filtered, paginated events plus facet counts for mobile clients"""
+    try:
+        filters = get_event_filters(request.args)
+        limit, offset = get_events_page(request.args)
+        
+        query = filter_events(EventSummary.query(), filters)
+        events_list = EventSummary.all(query.order_by(Event.created_at.desc(), Event.id.desc()).offset(offset).limit(limit))
+        
+        return jsonify({
+            'events': [event.to_dict() for event in events_list],
+            'total': query.count(),
+            'offset': offset,
+            'limit': limit,
+            'facets': get_event_facets(filters)
+        }), 200
+    except Exception as e:
+        logger.error(f"Error in events API: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to load events'}), 500
 
 @app.route('/clubs')
+@read_only_route
+@cached_page(lambda: ['clubs'])
 def clubs():
     try:
-        clubs_list = Club.query.all()
-        logger.info(f"Fetched {len(clubs_list)} clubs")
+        clubs_list = ClubCard.all(ClubCard.query())
+        logger.info(f"Fetched {len(clubs_list)} clubs", extra=SAMPLED)
         return render_template('clubs.html', clubs=clubs_list)
     except Exception as e:
         logger.error(f"Error in clubs route: {str(e)}", exc_info=True)
         flash('Error loading clubs', 'error')
-        return render_template('clubs.html', clubs=[])
+        return render_template('clubs.html', clubs=[]), 500
+
+@app.route('/api/clubs')
+@read_only_route
+@cached_page(lambda: ['clubs'])
+def clubs_api():
+    """JSON equivalent of the clubs page"""
+    try:
+        clubs_list = ClubCard.all(ClubCard.query().order_by(Club.id))
+        return jsonify({
+            'clubs': [{
+                'id': club.id,
+                'name': club.name,
+                'logo_url': image_url(club.logo_filename) if club.logo_filename else '',
+                'members_count': club.members_count or 0,
+                'description': club.description or '',
+                'is_recruiting': bool(club.is_recruiting),
+            } for club in clubs_list]
+        }), 200
+    except Exception as e:
+        logger.error(f"Error in clubs API: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to load clubs'}), 500
 
 @app.route('/club/<int:club_id>')
+@read_only_route
+@cached_page(lambda club_id: [f'club:{club_id}'])
 def club_detail(club_id):
     try:
-        logger.info(f"Attempting to fetch club with ID: {club_id}")
-        
-        # Fetch club
-        club = Club.query.get(club_id)
+        club = get_club_with_upcoming_events(club_id)
         
         if not club:
             logger.warning(f"Club with ID {club_id} not found")
             flash(f'Club not found', 'error')
             return redirect(url_for('clubs'))
         
-        logger.info(f"Successfully fetched club: {club.name}")
-        logger.debug(f"Club data: {club.to_dict()}")
+        logger.info(f"Fetched club {club_id}: {club.name}", extra=SAMPLED)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Club data: {club.to_dict()}")
         
         # Ensure all fields have safe values
         if not club.name:
@@ -341,14 +617,64 @@ def club_detail(club_id):
             club.members_count = 0
         if club.is_recruiting is None:
             club.is_recruiting = False
+        
+        # Only the first gallery page is rendered; the rest is lazy-loaded
+        gallery, gallery_has_more = first_gallery_page(club)
             
-        return render_template('club_detail.html', club=club)
+        return render_template('club_detail.html', club=club,
+                               upcoming_events=club.events,
+                               gallery=gallery,
+                               gallery_has_more=gallery_has_more)
         
     except Exception as e:
         logger.error(f"Error in club_detail for ID {club_id}: {str(e)}", exc_info=True)
         flash('Error loading club details', 'error')
         return redirect(url_for('clubs'))
 
+@app.route('/api/club/<int:club_id>')
+@read_only_route
+@cached_page(lambda club_id: [f'club:{club_id}'])
+def club_api(club_id):
+    """JSON equivalent of a club page"""
+    try:
+        club = get_club_with_upcoming_events(club_id)
+        if not club:
+            return jsonify({'error': 'Club not found'}), 404
+        gallery, gallery_has_more = first_gallery_page(club)
+        return jsonify({
+            'club': {**club.to_dict(),
+                     'gallery_images': [image.filename for image in gallery],
+                     'gallery_has_more': gallery_has_more},
+            'upcoming_events': [event.to_dict() for event in club.events]
+        }), 200
+    except Exception as e:
+        logger.error(f"Error in club API for ID {club_id}: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to load club'}), 500
+
+@app.route('/api/club/<int:club_id>/gallery')
+@read_only_route
+@cached_page(lambda club_id: [f'club:{club_id}'],
+             lambda: f"page={max(request.args.get('page', 1, type=int), 1)}")
+def club_gallery(club_id):
+    """Return one page of a club's gallery for lazy loading"""
+    try:
+        page = max(request.args.get('page', 1, type=int), 1)
+        filenames = (db.session.query(ClubGalleryImage.filename)
+                     .filter_by(club_id=club_id)
+                     .order_by(ClubGalleryImage.position)
+                     .offset((page - 1) * GALLERY_PAGE_SIZE)
+                     .limit(GALLERY_PAGE_SIZE + 1)
+                     .all())
+        
+        return jsonify({
+            'images': [image_url(filename) for (filename,) in filenames[:GALLERY_PAGE_SIZE]],
+            'page': page,
+            'has_more': len(filenames) > GALLERY_PAGE_SIZE
+        }), 200
+    except Exception as e:
+        logger.error(f"Error loading gallery for club {club_id}: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to load gallery'}), 500
+
 # ==================== MANAGER AUTHENTICATION ====================
 
 def manager_required(fn):
@@ -358,6 +684,9 @@ def manager_required(fn):
         if not session.get('manager_logged_in'):
             flash('Please login as manager to access this page', 'error')
             return redirect(url_for('index'))
+        # Manager POSTs are the only writers; serialize them at BEGIN
+        if request.method != 'GET':
+            mark_write_intent()
         return fn(*args, **kwargs)
     return wrapper
 
@@ -373,12 +702,18 @@ def manager_logout():
 
 # ==================== MANAGER DASHBOARD ====================
 
+@app.route('/manager/live')
+@manager_required
+def manager_live_updates():
+    """Live dashboard rows and totals; the manager counterpart of /api/live"""
+    return live_response({MANAGER_LIVE_TOPIC})
+
 @app.route('/manager/dashboard')
 @manager_required
 def manager_dashboard():
     try:
-        clubs_list = Club.query.all()
-        events_list = Event.query.order_by(Event.created_at.desc()).all()
+        clubs_list = DashboardClub.all(DashboardClub.query())
+        events_list = DashboardEvent.all(DashboardEvent.query().order_by(Event.created_at.desc()))
         total_clubs = len(clubs_list)
         total_members = sum(club.members_count or 0 for club in clubs_list)
         total_events = len(events_list)
@@ -407,7 +742,7 @@ def manager_edit_club(club_id):
         try:
             club.name = request.form.get('name', club.name)
             club.description = request.form.get('description', club.description)
-            club.logo_url = request.form.get('logo_url', club.logo_url)
+            club.logo_filename = request.form.get('logo_filename', club.logo_filename or '').strip() or None
             
             try:
                 club.members_count = int(request.form.get('members_count', club.members_count))
@@ -417,6 +752,16 @@ def manager_edit_club(club_id):
             club.is_recruiting = bool(request.form.get('is_recruiting'))
             club.application_link = request.form.get('application_link', '')
             
+            # Linked events show the club's current name
+            renamed = Event.query.filter_by(organizer_club_id=club.id).update({'organizer': club.name})
+            
+            publish_club_change('updated', club)
+            if renamed:
+                linked_events = Event.query.filter_by(organizer_club_id=club.id).all()
+                # The bulk update bypasses the flush, so log it explicitly
+                change_log.record(db.session, 'event', [event.id for event in linked_events])
+                for event in linked_events:
+                    publish_event_change('updated', event)
             db.session.commit()
             flash('Club updated successfully!', 'success')
             return redirect(url_for('manager_dashboard'))
@@ -436,13 +781,15 @@ def manager_new_club():
             new_club = Club(
                 name=request.form.get('name', 'New Club'),
                 description=request.form.get('description', ''),
-                logo_url=request.form.get('logo_url', ''),
+                logo_filename=request.form.get('logo_filename', '').strip() or None,
                 members_count=int(request.form.get('members_count', 0) or 0),
                 is_recruiting=bool(request.form.get('is_recruiting')),
                 application_link=request.form.get('application_link', '')
             )
             
             db.session.add(new_club)
+            db.session.flush()
+            publish_club_change('created', new_club)
             db.session.commit()
             flash('New club created successfully!', 'success')
             return redirect(url_for('manager_dashboard'))
@@ -460,6 +807,7 @@ def manager_delete_club(club_id):
     try:
         club = Club.query.get_or_404(club_id)
         db.session.delete(club)
+        publish_club_change('deleted', club)
         db.session.commit()
         flash('Club deleted successfully!', 'success')
     except Exception as e:
@@ -471,18 +819,101 @@ def manager_delete_club(club_id):
 
 # ==================== CLUB MEMBER MANAGEMENT ====================
 
+# Roster pages are seeked by (joined_at, id), so a page costs the same in any club
+MEMBER_PAGE_SIZE = int(os.environ.get('MEMBER_PAGE_SIZE', 25))
+# The roster header counts up to here and then shows "1000+"
+MEMBER_COUNT_CAP = 1000
+
+def encode_member_cursor(member):
+    """Opaque roster position just after ``member``"""
+    joined_at = member.joined_at.isoformat() if member.joined_at else ''
+    return f'{joined_at}_{member.id}'
+
+def decode_member_cursor(cursor):
+    """(joined_at or None, id) from a cursor; raises ValueError when malformed"""
+    joined_at, _, member_id = cursor.rpartition('_')
+    return (datetime.fromisoformat(joined_at) if joined_at else None), int(member_id)
+
+def filter_members(club_id, search):
+    query = MemberCard.query().filter(ClubMember.club_id == club_id)
+    if search:
+        pattern = '%' + re.sub(r'([\\%_])', r'\\\1', search) + '%'
+        query = query.filter(or_(ClubMember.name.ilike(pattern, escape='\\'),
+                                 ClubMember.role.ilike(pattern, escape='\\')))
+    return query
+
+def get_member_page(club_id, search='', after=None):
+    """One roster page (newest first) and the cursor of the next one, or None.
+
+    Members with a join date come first, seeked on the (club_id, joined_at,
+    id) index; the rare undated ones follow by id. Two seeks instead of an
+    OR keep both on the index."""
+    query = filter_members(club_id, search)
+    joined_at, member_id = decode_member_cursor(after) if after else (None, None)
+    members = []
+    if not after or joined_at:
+        dated = query.filter(ClubMember.joined_at.isnot(None))
+        if after:
+            dated = dated.filter(tuple_(ClubMember.joined_at, ClubMember.id) < (joined_at, member_id))
+        members = MemberCard.all(dated.order_by(ClubMember.joined_at.desc(), ClubMember.id.desc()).limit(MEMBER_PAGE_SIZE + 1))
+    if len(members) <= MEMBER_PAGE_SIZE:
+        undated = query.filter(ClubMember.joined_at.is_(None))
+        if after and not joined_at:
+            undated = undated.filter(ClubMember.id < member_id)
+        members += MemberCard.all(undated.order_by(ClubMember.id.desc()).limit(MEMBER_PAGE_SIZE + 1 - len(members)))
+    if len(members) > MEMBER_PAGE_SIZE:
+        return members[:MEMBER_PAGE_SIZE], encode_member_cursor(members[MEMBER_PAGE_SIZE - 1])
+    return members, None
+
+def count_members(club_id):
+    """Roster size, counted on the club_id index no further than MEMBER_COUNT_CAP"""
+    capped = select(ClubMember.id).where(ClubMember.club_id == club_id).limit(MEMBER_COUNT_CAP + 1).subquery()
+    count = db.session.scalar(select(func.count()).select_from(capped))
+    return f'{MEMBER_COUNT_CAP}+' if count > MEMBER_COUNT_CAP else str(count)
+
+def member_count_label(club_id, search, members, next_cursor):
+    """Roster header count: the capped roster size, or for a search the
+    first page's matches ("25+" when more follow) instead of a second scan"""
+    if not search:
+        return count_members(club_id)
+    return f'{len(members)}+' if next_cursor else str(len(members))
+
 @app.route('/manager/club/<int:club_id>/members', methods=['GET'])
 @manager_required
 def manager_club_members(club_id):
     try:
         club = Club.query.get_or_404(club_id)
-        members = ClubMember.query.filter_by(club_id=club_id).order_by(ClubMember.joined_at.desc()).all()
-        return render_template('club_members.html', club=club, members=members)
+        search = request.args.get('q', '').strip()
+        try:
+            members, next_cursor = get_member_page(club_id, search, request.args.get('after'))
+        except ValueError:
+            # Malformed cursor (the JSON route answers 400): start over at the first page
+            members, next_cursor = get_member_page(club_id, search)
+        return render_template('club_members.html', club=club, members=members, next_cursor=next_cursor,
+                               search=search,
+                               member_count=member_count_label(club_id, search, members, next_cursor))
     except Exception as e:
         logger.error(f"Error loading club members: {str(e)}", exc_info=True)
         flash('Error loading club members', 'error')
         return redirect(url_for('manager_dashboard'))
 
+@app.route('/manager/club/<int:club_id>/members.json', methods=['GET'])
+@manager_required
+def manager_club_members_json(club_id):
+    """Roster page as JSON: ?q=<search>&after=<cursor>; ?html=1 adds the rendered cards"""
+    search = request.args.get('q', '').strip()
+    after = request.args.get('after')
+    try:
+        members, next_cursor = get_member_page(club_id, search, after)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    data = {'members': [member_payload(member) for member in members], 'next': next_cursor}
+    if not after:
+        data['count'] = member_count_label(club_id, search, members, next_cursor)
+    if request.args.get('html') == '1':
+        data['html'] = ''.join(render_template('_member_card.html', member=member) for member in members)
+    return jsonify(data), 200
+
 @app.route('/manager/club/<int:club_id>/members/add', methods=['POST'])
 @manager_required
 def manager_add_member(club_id):
@@ -500,6 +931,7 @@ def manager_add_member(club_id):
             return redirect(url_for('manager_club_members', club_id=club_id))
         
         db.session.add(new_member)
+        publish_member_change(club_id)
         db.session.commit()
         flash(f'{new_member.name} added successfully!', 'success')
     except Exception as e:
@@ -522,6 +954,7 @@ def manager_edit_member(club_id, member_id):
         member.name = request.form.get('name', member.name).strip()
         member.role = request.form.get('role', member.role).strip()
         
+        publish_member_change(club_id)
         db.session.commit()
         flash(f'{member.name} updated successfully!', 'success')
     except Exception as e:
@@ -543,6 +976,7 @@ def manager_delete_member(club_id, member_id):
         
         member_name = member.name
         db.session.delete(member)
+        publish_member_change(club_id)
         db.session.commit()
         flash(f'{member_name} removed successfully!', 'success')
     except Exception as e:
@@ -554,6 +988,20 @@ def manager_delete_member(club_id, member_id):
 
 # ==================== EVENT MANAGEMENT ====================
 
+def get_club_choices():
+    """(id, name) rows for the organizing-club select"""
+    return db.session.execute(select(Club.id, Club.name).order_by(Club.name)).all()
+
+def apply_event_organizer(event, form):
+    """Link ``event`` to the selected club, or fall back to a free-text organizer"""
+    club = db.session.get(Club, form.get('organizer_club_id', type=int) or 0)
+    if club:
+        event.organizer_club_id = club.id
+        event.organizer = club.name
+    else:
+        event.organizer_club_id = None
+        event.organizer = form.get('organizer', event.organizer or '').strip()
+
 @app.route('/manager/event/<int:event_id>/edit', methods=['GET', 'POST'])
 @manager_required
 def manager_edit_event(event_id):
@@ -567,10 +1015,11 @@ def manager_edit_event(event_id):
             event.date = request.form.get('date', event.date)
             event.time = request.form.get('time', event.time)
             event.location = request.form.get('location', event.location)
-            event.organizer = request.form.get('organizer', event.organizer)
+            apply_event_organizer(event, request.form)
             event.image_url = request.form.get('image_url', event.image_url)
             event.size_class = request.form.get('size_class', event.size_class)
             
+            publish_event_change('updated', event)
             db.session.commit()
             flash('Event updated successfully!', 'success')
             return redirect(url_for('manager_dashboard'))
@@ -579,7 +1028,8 @@ def manager_edit_event(event_id):
             db.session.rollback()
             flash('Error updating event', 'error')
     
-    return render_template('event_edit.html', event=event)
+    return render_template('event_edit.html', event=event, clubs=get_club_choices(),
+                           available_images=get_available_images())
 
 @app.route('/manager/event/new', methods=['GET', 'POST'])
 @manager_required
@@ -593,12 +1043,14 @@ def manager_new_event():
                 date=request.form.get('date', ''),
                 time=request.form.get('time', ''),
                 location=request.form.get('location', ''),
-                organizer=request.form.get('organizer', ''),
                 image_url=request.form.get('image_url', '/static/images/club.jpg'),
                 size_class=request.form.get('size_class', 'size-medium')
             )
+            apply_event_organizer(new_event, request.form)
             
             db.session.add(new_event)
+            db.session.flush()
+            publish_event_change('created', new_event)
             db.session.commit()
             flash('New event created successfully!', 'success')
             return redirect(url_for('manager_dashboard'))
@@ -607,7 +1059,8 @@ def manager_new_event():
             db.session.rollback()
             flash('Error creating event', 'error')
     
-    return render_template('event_edit.html', event=None)
+    return render_template('event_edit.html', event=None, clubs=get_club_choices(),
+                           available_images=get_available_images())
 
 @app.route('/manager/event/<int:event_id>/delete', methods=['POST'])
 @manager_required
@@ -615,6 +1068,7 @@ def manager_delete_event(event_id):
     try:
         event = Event.query.get_or_404(event_id)
         db.session.delete(event)
+        publish_event_change('deleted', event)
         db.session.commit()
         flash('Event deleted successfully!', 'success')
     except Exception as e:
@@ -624,9 +1078,134 @@ def manager_delete_event(event_id):
     
     return redirect(url_for('manager_dashboard'))
 
+# ==================== IMAGE UPLOADS ====================
+
+# Uploads land in templates/images under content-hashed names; decoding and
+# resizing (Pillow, optional) happen on a background pool. See uploads.py.
+image_uploads = ImageUploads(
+    os.path.join(app.root_path, 'templates', 'images'),
+    os.path.join(app.instance_path, 'uploads'),
+    max_bytes=int(os.environ.get('IMAGE_UPLOAD_MAX_BYTES', 8 * 1024 * 1024)),
+    max_dimension=int(os.environ.get('IMAGE_MAX_DIMENSION', 1600)),
+    workers=int(os.environ.get('IMAGE_UPLOAD_WORKERS', 2))
+)
+
+UPLOAD_ID = re.compile(r'^[0-9a-f]{16}$')
+
+def describe_upload(upload):
+    """Add the image URL (once ready) and the status URL to an upload status"""
+    if upload['status'] == 'ready':
+        upload['url'] = url_for('serve_template_image', filename=upload['filename'])
+    upload['status_url'] = url_for('manager_image_status', upload_id=upload['id'])
+    return upload
+
+@app.route('/manager/images')
+@manager_required
+def manager_images():
+    """Images the editors can pick from"""
+    return jsonify({
+        'images': [{'filename': name, 'url': image_url(name)} for name in get_available_images()]
+    }), 200
+
+@app.route('/manager/images/upload', methods=['POST'])
+@manager_required
+def manager_upload_image():
+    """Stream the raw request body (not multipart) to disk and queue it for processing"""
+    try:
+        upload = image_uploads.receive(request.stream, request.content_length)
+        return jsonify(describe_upload(upload)), 200 if upload['status'] == 'ready' else 202
+    except UploadRejected as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        logger.error(f"Error receiving image upload: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Upload failed'}), 500
+
+@app.route('/manager/images/<upload_id>/status')
+@manager_required
+def manager_image_status(upload_id):
+    upload = image_uploads.status(upload_id) if UPLOAD_ID.match(upload_id) else None
+    if upload is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    return jsonify(describe_upload(upload)), 200
+
+# ==================== PROFILING ====================
+
+@app.route('/manager/profiles')
+@manager_required
+def manager_profiles():
+    """Saved captures and background sampler counters"""
+    return jsonify({'captures': list_captures(), 'stats': profiler_stats()}), 200
+
+@app.route('/manager/profiles/background.folded')
+@manager_required
+def manager_background_profile():
+    """This worker's background samples as folded stacks; ?reset=1 starts a new window"""
+    folded = background_folded(reset=request.args.get('reset') == '1')
+    return Response(folded, mimetype='text/plain',
+                    headers={'Content-Disposition': 'attachment; filename=background.folded'})
+
+@app.route('/manager/profiles/<name>')
+@manager_required
+def manager_download_profile(name):
+    """Download a capture: .prof for snakeviz/pstats, .folded for flamegraph.pl/speedscope"""
+    if not CAPTURE_NAME.match(name):
+        abort(404)
+    return send_from_directory(PROFILE_DIR, name, as_attachment=True)
+
+# ==================== AUTOCOMPLETE ====================
+
+# In-memory prefix index over club names, event titles and organizers (see
+# autocomplete.py); this worker's commits update it in place, other
+# workers' writes are picked up within AUTOCOMPLETE_REFRESH_SECONDS
+catalog_autocomplete = CatalogAutocomplete(float(os.environ.get('AUTOCOMPLETE_REFRESH_SECONDS', 10)))
+catalog_autocomplete.install_hooks(RoutingSession)
+
+@app.route('/api/autocomplete')
+def autocomplete():
+    """Type-ahead for the search and chatbot inputs: ?q=<text so far>&limit=<n>"""
+    query = request.args.get('q', '')[:200]
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+    response = jsonify(catalog_autocomplete.complete(query, limit))
+    response.headers['Cache-Control'] = 'public, max-age=10'
+    return response
+
 # ==================== CHATBOT ROUTES ====================
 
+# Token buckets shared by all workers on the host (burst, refills per minute)
+chatbot_limiter = TokenBucketLimiter(
+    create_store(os.environ.get('RATE_LIMIT_DB', os.path.join(app.instance_path, 'rate_limits.db'))),
+    {
+        'session': (int(os.environ.get('CHATBOT_SESSION_BURST', 5)),
+                    int(os.environ.get('CHATBOT_SESSION_PER_MINUTE', 10))),
+        'ip': (int(os.environ.get('CHATBOT_IP_BURST', 20)),
+               int(os.environ.get('CHATBOT_IP_PER_MINUTE', 60))),
+    }
+)
+
+# Identical questions already in flight share one inference call
+chatbot_single_flight = SingleFlight()
+
+# Exchanges and feedback are written in batches off the request path (see
+# transcripts.py); CHAT_TRANSCRIPTS=0 stops keeping the questions and answers
+transcript_sink = TranscriptSink(
+    app,
+    queue_size=int(os.environ.get('TRANSCRIPT_QUEUE_SIZE', 1000)),
+    batch_size=int(os.environ.get('TRANSCRIPT_BATCH_SIZE', 100)),
+    flush_interval=float(os.environ.get('TRANSCRIPT_FLUSH_INTERVAL', 2.0)),
+    shutdown_timeout=float(os.environ.get('TRANSCRIPT_SHUTDOWN_TIMEOUT', 5.0))
+)
+CHAT_TRANSCRIPTS = os.environ.get('CHAT_TRANSCRIPTS', '1').lower() not in ('0', 'false', 'no')
+# How many of its latest answers a session may rate
+FEEDBACK_WINDOW = 20
+
+def chatbot_rate_keys():
+    """Rate-limit keys for the current chatbot request"""
+    if 'chat_sid' not in session:
+        session['chat_sid'] = uuid.uuid4().hex
+    return {'session': session['chat_sid'], 'ip': request.remote_addr}
+
 @app.route('/api/chatbot/message', methods=['POST'])
+@chatbot_limiter.limit('message', chatbot_rate_keys)
 def chatbot_message():
     """Handle chatbot messages"""
     try:
@@ -644,19 +1223,40 @@ def chatbot_message():
         if not user_message:
             return jsonify({'error': 'Message cannot be empty'}), 400
         
-        logger.info(f"Received chatbot message: {user_message[:50]}...")
+        logger.info(f"Received chatbot message: {user_message[:50]}...", extra=SAMPLED)
         
         # Generate response with database context
+        started = time.perf_counter()
+        served = {'path': 'shared'}
+        
+        def ask():
+            # Only the request that runs the model gets here; identical
+            # questions in flight share its answer
+            served['path'] = 'model'
+            return chatbot.generate_response_with_usage(user_message, db)
+        
         with app.app_context():
-            response = chatbot.generate_response(user_message, db)
+            question_key = ' '.join(user_message.lower().split())
+            with span('inference'):
+                response, usage = chatbot_single_flight.do(question_key, ask)
+            latency_ms = (time.perf_counter() - started) * 1000
             context = chatbot.get_database_context(db)
             suggestions = chatbot.get_quick_suggestions(context)
         
-        logger.info("Generated chatbot response successfully")
+        logger.info("Generated chatbot response successfully", extra={**SAMPLED, 'usage': usage})
+        
+        exchange_id = uuid.uuid4().hex
+        if CHAT_TRANSCRIPTS:
+            path = served['path'] if usage is not None else ('fallback' if chatbot.client else 'unavailable')
+            transcript_sink.record_exchange(exchange_id, session.get('chat_sid'), user_message, response,
+                                            path, latency_ms, usage)
+        session['chat_exchanges'] = session.get('chat_exchanges', [])[-(FEEDBACK_WINDOW - 1):] + [exchange_id]
         
         return jsonify({
             'response': response,
             'suggestions': suggestions,
+            'usage': usage,
+            'exchange_id': exchange_id,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -667,6 +1267,24 @@ def chatbot_message():
             'response': "I'm having trouble right now. Please try again! 🔄"
         }), 500
 
+@app.route('/api/chatbot/feedback', methods=['POST'])
+@chatbot_limiter.limit('feedback', chatbot_rate_keys)
+def chatbot_feedback():
+    """Thumbs up (1) or down (-1) on one of this session's recent answers"""
+    data = request.get_json(silent=True) or {}
+    exchange_id = data.get('exchange_id')
+    rating = data.get('rating')
+    
+    if rating not in (1, -1) or isinstance(rating, bool):
+        return jsonify({'error': 'Rating must be 1 or -1'}), 400
+    if exchange_id not in session.get('chat_exchanges', []):
+        return jsonify({'error': 'Unknown answer'}), 404
+    
+    comment = str(data.get('comment') or '').strip()[:500] or None
+    if not transcript_sink.record_feedback(exchange_id, session.get('chat_sid'), rating, comment):
+        return jsonify({'error': 'Feedback is not being accepted right now, please try again later'}), 503
+    return jsonify({'message': 'Thanks for the feedback!'}), 202
+
 @app.route('/api/chatbot/clear', methods=['POST'])
 def chatbot_clear():
     """Clear chatbot conversation history"""
@@ -681,6 +1299,7 @@ def chatbot_clear():
         return jsonify({'error': 'Failed to clear conversation'}), 500
 
 @app.route('/api/chatbot/suggestions', methods=['GET'])
+@chatbot_limiter.limit('suggestions', chatbot_rate_keys)
 def chatbot_suggestions():
     """Get quick reply suggestions"""
     try:
@@ -697,35 +1316,170 @@ def chatbot_suggestions():
 
 # ==================== HEALTH CHECK ====================
 
+# Probes answer from the results of background checks (see health.py), so
+# load balancer traffic never reaches the database or the inference API.
+# The inference check is a request to Hugging Face and runs less often.
+health_monitor = HealthMonitor(
+    app,
+    interval=int(os.environ.get('HEALTH_CHECK_INTERVAL', 15)),
+    timeout=int(os.environ.get('HEALTH_CHECK_TIMEOUT', 5))
+)
+
+def pool_details(engine):
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return {}
+    return {'size': pool.size(), 'checked_out': pool.checkedout(), 'idle': pool.checkedin()}
+
+def check_engine(bind_key):
+    engine = db.engines[bind_key]
+    with engine.connect() as conn:
+        conn.execute(db.text('SELECT 1'))
+    return pool_details(engine)
+
+def check_inference():
+    if chatbot is None or chatbot.client is None:
+        raise CheckDisabled('chatbot not configured')
+    model_status = chatbot.client.get_model_status()
+    if not model_status.loaded and model_status.state != 'Loadable':
+        raise RuntimeError(f'model {model_status.state}')
+    return {'model': chatbot.model, 'state': model_status.state}
+
+def check_assets():
+    directories = {
+        'images': (image_uploads.images_dir, os.R_OK | os.W_OK),
+        'uploads': (image_uploads.work_dir, os.W_OK),
+        'static': (app.static_folder, os.R_OK),
+    }
+    if static_exporter:
+        directories['export'] = (static_exporter.directory, os.W_OK)
+    unusable = [name for name, (path, mode) in directories.items() if not os.access(path, mode)]
+    if unusable:
+        raise RuntimeError(f"not accessible: {', '.join(unusable)}")
+    return {'free_mb': shutil.disk_usage(app.instance_path).free // (1024 * 1024)}
+
+health_monitor.register('database', lambda: check_engine(None))
+if REPLICA_BIND_KEY in app.config.get('SQLALCHEMY_BINDS', {}):
+    # Every worker shares it: losing it marks them degraded instead of taking all out of rotation
+    health_monitor.register('replica', lambda: check_engine(REPLICA_BIND_KEY), critical=False)
+health_monitor.register('inference', check_inference, critical=False,
+                        interval=int(os.environ.get('HEALTH_INFERENCE_INTERVAL', 60)))
+health_monitor.register('assets', check_assets)
+
+def probe_response(data, code):
+    response = jsonify(data)
+    response.status_code = code
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/livez')
+def livez():
+    return probe_response(health_monitor.liveness(), 200)
+
+@app.route('/readyz')
+def readyz():
+    """Last-known readiness: 200 when ready or degraded, 503 otherwise"""
+    status = health_monitor.status()
+    return probe_response(status, 200 if status['ready'] else 503)
+
 @app.route('/health')
 def health():
-    try:
-        db.session.execute(db.text('SELECT 1'))
-        chatbot_status = 'initialized' if chatbot else 'not initialized'
-        return jsonify({
-            'status': 'healthy',
-            'database': 'connected',
-            'chatbot': chatbot_status
-        }), 200
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return jsonify({
-            'status': 'unhealthy',
-            'database': 'disconnected',
-            'error': str(e)
-        }), 500
+    status = health_monitor.status()
+    database = status['checks']['database']
+    return probe_response({
+        'status': 'healthy' if status['ready'] else 'unhealthy',
+        'readiness': status['status'],
+        'database': {'ok': 'connected', 'pending': 'pending'}.get(database['status'], 'disconnected'),
+        'chatbot': 'initialized' if chatbot else 'not initialized',
+        'checks': status['checks'],
+        'logging': logging_stats(),
+        'live': live_broker.stats(),
+        'autocomplete': catalog_autocomplete.stats(),
+        'cache': cache.stats(),
+        'transcripts': transcript_sink.stats()
+    }, 200 if status['ready'] else 503)
 
 # ==================== IMAGE SERVING ROUTE ====================
 
+# How image bytes leave the server: '' streams them from Python, 'x-accel'
+# hands them to nginx (X-Accel-Redirect) and 'x-sendfile' to Apache/lighttpd
+IMAGE_OFFLOAD_MODE = os.environ.get('IMAGE_OFFLOAD_MODE', '').strip().lower()
+# Internal nginx location that aliases templates/images (x-accel mode only)
+IMAGE_ACCEL_PREFIX = os.environ.get('IMAGE_ACCEL_PREFIX', '/internal/template-images/')
+# Cache lifetime for images whose name does not carry a content hash
+IMAGE_MAX_AGE = int(os.environ.get('IMAGE_MAX_AGE', 3600))
+IMMUTABLE_MAX_AGE = 31536000
+
+# Names such as "logo.3f9a6c1e2b7d4a05.png" or "3f9a6c1e2b7d4a05.png" embed
+# their content hash, so they can be cached forever
+HASHED_IMAGE_NAME = re.compile(r'(?:^|[._-])[0-9a-f]{16,64}\.[A-Za-z0-9]+$')
+
+# path -> (mtime_ns, size, etag); avoids re-hashing unchanged files
+_image_etags = {}
+
+def get_image_etag(path, stat):
+    """Return a strong, content-based ETag for an image file"""
+    cached = _image_etags.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()[:32]
+    _image_etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+    return etag
+
+def apply_image_cache_headers(response, filename):
+    """Long-lived immutable caching for hashed names, revalidation otherwise"""
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    if HASHED_IMAGE_NAME.search(filename):
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = IMAGE_MAX_AGE
+    return response
+
+def offloaded_image_response(path, filename, stat, etag):
+    """Headers-only response; the front proxy sends the bytes (and handles Range)"""
+    response = app.response_class()
+    response.headers['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response.set_etag(etag)
+    response.last_modified = stat.st_mtime
+    # Same If-None-Match/If-Modified-Since handling as send_file(conditional=True)
+    response.make_conditional(request)
+    if response.status_code == 200:
+        if IMAGE_OFFLOAD_MODE == 'x-accel':
+            response.headers['X-Accel-Redirect'] = IMAGE_ACCEL_PREFIX + quote(filename)
+        else:
+            response.headers['X-Sendfile'] = path
+    return apply_image_cache_headers(response, filename)
+
 @app.route('/templates/images/<path:filename>')
 def serve_template_image(filename):
-    """Serve images from templates/images directory"""
+    """Serve images from templates/images with ETag, conditional GET and Range support"""
     images_path = os.path.join(app.root_path, 'templates', 'images')
+    path = safe_join(images_path, filename)
+    
     try:
-        return send_from_directory(images_path, filename)
-    except FileNotFoundError:
+        stat = os.stat(path) if path else None
+    except OSError:
+        stat = None
+    if stat is None or not os.path.isfile(path):
         logger.error(f"Image not found: {filename}")
         abort(404)
+    
+    etag = get_image_etag(path, stat)
+    
+    if IMAGE_OFFLOAD_MODE in ('x-accel', 'x-sendfile'):
+        return offloaded_image_response(path, filename, stat, etag)
+    
+    # conditional=True gives us 304s for If-None-Match/If-Modified-Since
+    # and 206 partial responses for Range requests
+    response = send_file(path, conditional=True, etag=etag, last_modified=stat.st_mtime)
+    return apply_image_cache_headers(response, filename)
 
 # ==================== RUN ====================
 
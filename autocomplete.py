@@ -0,0 +1,241 @@
+import re
+import time
+import bisect
+import logging
+import threading
+import unicodedata
+from collections import Counter
+from sqlalchemy import event, inspect, select, text
+from models import db, Club, Event
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r'[^\w]+')
+
+# Listed first when two kinds share a label (a club is also an organizer)
+KIND_ORDER = {'club': 0, 'organizer': 1, 'event': 2}
+
+def normalize(value):
+    """Case- and accent-insensitive form of ``value``: lowercase words joined by single spaces"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return ' '.join(_NON_WORD.sub(' ', value.casefold()).split())
+
+def index_keys(label):
+    """Keys a label is found under: the name from each word on, so "ro" finds "IIIT Robotics Club" """
+    words = normalize(label).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+class PrefixIndex:
+    """Sorted array of ``(key, kind, ref)`` searched with bisect.
+
+    ``ref`` is the row id for clubs and events and the label itself for
+    organizers, which are counted so an organizer stays listed while any
+    event uses it. All access goes through one lock; lookups are a bisect
+    plus a short scan, so they stay in the microseconds.
+    """
+
+    # Matches looked at per query before ranking; bounds one-letter prefixes
+    SCAN_LIMIT = 200
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = []
+        self.labels = {}
+        self.organizers = Counter()
+
+    # ==================== WRITING ====================
+
+    def _add(self, kind, ref, label):
+        keys = index_keys(label)
+        self.labels[(kind, ref)] = (label, keys[0] if keys else '')
+        for key in keys:
+            bisect.insort(self.keys, (key, kind, ref))
+
+    def _remove(self, kind, ref):
+        label, _ = self.labels.pop((kind, ref), (None, None))
+        if label is None:
+            return
+        for key in index_keys(label):
+            i = bisect.bisect_left(self.keys, (key, kind, ref))
+            if i < len(self.keys) and self.keys[i] == (key, kind, ref):
+                del self.keys[i]
+
+    def apply(self, changes):
+        """Apply ``(op, kind, ref, label)`` changes; ``op`` is 'set' or 'remove' (organizers: '+' or '-')"""
+        with self.lock:
+            for op, kind, ref, label in changes:
+                if kind == 'organizer':
+                    self.organizers[label] += 1 if op == '+' else -1
+                    if self.organizers[label] <= 0:
+                        del self.organizers[label]
+                        self._remove('organizer', label)
+                    elif ('organizer', label) not in self.labels:
+                        self._add('organizer', label, label)
+                    continue
+                self._remove(kind, ref)
+                if op == 'set' and label:
+                    self._add(kind, ref, label)
+
+    def load(self, clubs, events):
+        """Replace the contents with ``(id, name)`` clubs and ``(id, title, organizer)`` events"""
+        keys, labels = [], {}
+        organizers = Counter(organizer for _, _, organizer in events if organizer)
+        entries = ([('club', club_id, name) for club_id, name in clubs] +
+                   [('event', event_id, title) for event_id, title, _ in events] +
+                   [('organizer', organizer, organizer) for organizer in organizers])
+        for kind, ref, label in entries:
+            label_keys = index_keys(label)
+            if label_keys:
+                labels[(kind, ref)] = (label, label_keys[0])
+                keys.extend((key, kind, ref) for key in label_keys)
+        keys.sort()
+        with self.lock:
+            self.keys, self.labels, self.organizers = keys, labels, organizers
+
+    # ==================== READING ====================
+
+    def lookup(self, prefix, limit):
+        """Best ``limit`` matches for a normalized ``prefix``: whole-name matches, then
+        by kind and label"""
+        matches = []
+        with self.lock:
+            i = bisect.bisect_left(self.keys, (prefix,))
+            for key, kind, ref in self.keys[i:i + self.SCAN_LIMIT]:
+                if not key.startswith(prefix):
+                    break
+                label, name = self.labels[(kind, ref)]
+                matches.append((key != name, KIND_ORDER[kind], name, kind, ref, label))
+        matches.sort()
+        results, seen = [], set()
+        for _, _, name, kind, ref, label in matches:
+            if (kind, ref) in seen or name in seen:
+                continue
+            seen.update(((kind, ref), name))
+            results.append({'label': label, 'kind': kind, 'id': ref if kind != 'organizer' else None})
+            if len(results) == limit:
+                break
+        return results
+
+    def complete(self, query, limit=8, max_words=4):
+        """Suggestions for the end of ``query``.
+
+        Free text such as "when does the coding cl" is tried from its last
+        ``max_words`` words down to the last one; the first tail with
+        matches wins. ``words`` is how many trailing words a suggestion
+        replaces (0 when nothing matched).
+        """
+        words = normalize(query).split()[-max_words:]
+        for start in range(len(words)):
+            prefix = ' '.join(words[start:])
+            results = self.lookup(prefix, limit)
+            if results:
+                return {'words': len(words) - start, 'suggestions': results}
+        return {'words': 0, 'suggestions': []}
+
+    def __len__(self):
+        return len(self.labels)
+
+class CatalogAutocomplete:
+    """Keeps a PrefixIndex of club names, event titles and organizers current.
+
+    Commits in this worker are applied incrementally from the flushed rows.
+    Other workers' writes are picked up by comparing the change log's
+    current version (see changes.py) at most every ``refresh_interval``
+    seconds and reloading when it moved.
+    """
+
+    def __init__(self, refresh_interval=10.0):
+        self.refresh_interval = refresh_interval
+        self.index = PrefixIndex()
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = None
+        self.rebuilds = 0
+
+    def rebuild(self):
+        """Reload the whole index from the database (needs an app context)"""
+        with db.engine.connect() as conn:
+            version = conn.execute(text("SELECT MAX(version) FROM change_log")).scalar()
+            clubs = conn.execute(select(Club.id, Club.name)).all()
+            events = conn.execute(select(Event.id, Event.title, Event.organizer)).all()
+        self.index.load(clubs, events)
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.rebuilds += 1
+        logger.debug(f"Autocomplete index rebuilt: {len(self.index)} names")
+
+    def refresh_if_stale(self):
+        if self.checked_at is not None and time.monotonic() - self.checked_at < self.refresh_interval:
+            return
+        # One request does the check; the others keep answering from the current index
+        if not self.lock.acquire(blocking=self.checked_at is None):
+            return
+        try:
+            if self.checked_at is None:
+                self.rebuild()
+                return
+            self.checked_at = time.monotonic()
+            with db.engine.connect() as conn:
+                version = conn.execute(text("SELECT MAX(version) FROM change_log")).scalar()
+            if version != self.version:
+                self.rebuild()
+        except Exception as e:
+            logger.error(f"Autocomplete refresh failed: {str(e)}", exc_info=True)
+        finally:
+            self.lock.release()
+
+    def complete(self, query, limit=8):
+        self.refresh_if_stale()
+        return self.index.complete(query, limit)
+
+    def stats(self):
+        return {'names': len(self.index), 'keys': len(self.index.keys), 'rebuilds': self.rebuilds}
+
+    # ==================== INCREMENTAL UPDATES ====================
+
+    @staticmethod
+    def changes_for(obj, deleted=False):
+        """Index changes implied by a flushed ``obj``"""
+        if isinstance(obj, Club):
+            return [('remove' if deleted else 'set', 'club', obj.id, obj.name)]
+        if not isinstance(obj, Event):
+            return []
+        changes = [('remove' if deleted else 'set', 'event', obj.id, obj.title)]
+        if deleted:
+            changes.append(('-', 'organizer', None, obj.organizer))
+        else:
+            history = inspect(obj).attrs.organizer.history
+            changes.extend(('-', 'organizer', None, organizer) for organizer in history.deleted if organizer)
+            changes.extend(('+', 'organizer', None, organizer) for organizer in history.added if organizer)
+        return changes
+
+    def install_hooks(self, session_class):
+        """Apply the index changes of every committed flush of ``session_class``"""
+
+        @event.listens_for(session_class, 'after_flush')
+        def collect_changes(session, flush_context):
+            changes = session.info.setdefault('autocomplete_changes', [])
+            for obj in session.new:
+                changes.extend(self.changes_for(obj))
+            for obj in session.dirty:
+                if isinstance(obj, Club) and inspect(obj).attrs.name.history.has_changes():
+                    # A rename also rewrites linked events' organizer in bulk,
+                    # which never reaches the flush: reload instead
+                    session.info['autocomplete_rebuild'] = True
+                changes.extend(self.changes_for(obj))
+            for obj in session.deleted:
+                changes.extend(self.changes_for(obj, deleted=True))
+
+        @event.listens_for(session_class, 'after_commit')
+        def apply_changes(session):
+            changes = session.info.pop('autocomplete_changes', None)
+            if session.info.pop('autocomplete_rebuild', False):
+                self.checked_at = None
+            elif changes and self.checked_at is not None:
+                self.index.apply(changes)
+
+        @event.listens_for(session_class, 'after_rollback')
+        def discard_changes(session):
+            session.info.pop('autocomplete_changes', None)
+            session.info.pop('autocomplete_rebuild', False)
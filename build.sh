@@ -6,4 +6,12 @@ pip install --upgrade pip
 pip install -r requirements.txt
 
 # Run database migrations
-python init_db.py
\ No newline at end of file
+python migrations.py upgrade
+
+# Seed initial data into empty tables
+python init_db.py
+
+# Export public pages for the front proxy when static export mode is on
+if [ -n "$STATIC_EXPORT_DIR" ]; then
+    python static_export.py
+fi
@@ -0,0 +1,411 @@
+"""Shared cache with tag-based invalidation.
+
+The backend is chosen by CACHE_URL:
+
+    memory://?max_entries=2000           per-process LRU (one worker, development)
+    sqlite:///path/to/cache.db           one file shared by every worker on the host
+    redis://[:password@]host:6379/0      Redis, or any server speaking its protocol
+
+Entries carry tags such as ``club:3`` or ``events``. Each tag has a random
+token in the backend; an entry remembers the tokens it was stored under and
+is stale once any of them changes, so invalidating a tag is one write no
+matter how many entries use it (and a tag evicted from the backend simply
+gets a new token).
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from sqlalchemy import event
+from rate_limit import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# ==================== BACKENDS ====================
+
+class MemoryBackend:
+    """Bounded LRU in this process"""
+
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _live(self, key, now):
+        item = self.entries.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= now:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def get_many(self, keys):
+        now = time.time()
+        with self.lock:
+            return [self._live(key, now) for key in keys]
+
+    def _store(self, key, value, ttl):
+        self.entries[key] = (value, time.time() + ttl if ttl else None)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self._store(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        """Set ``key`` only if it is absent; True when it was set"""
+        with self.lock:
+            if self._live(key, time.time()) is not None:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+class SQLiteBackend:
+    """Entries in a SQLite file shared by the workers on a host (see SQLiteBucketStore)"""
+
+    CLEANUP_EVERY = 200
+
+    def __init__(self, path, max_entries=20000):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        self.writes = 0
+        self._connect().execute('CREATE TABLE IF NOT EXISTS cache ('
+                                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)')
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        rows = self._connect().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({', '.join('?' * len(keys))}) "
+            "AND (expires IS NULL OR expires > ?)", (*keys, time.time())).fetchall()
+        found = dict(rows)
+        return [found.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                     (key, value, time.time() + ttl if ttl else None))
+        self.writes += 1
+        if self.writes % self.CLEANUP_EVERY == 0:
+            self._cleanup(conn)
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            added = conn.execute('INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                                 (key, value, now + ttl if ttl else None)).rowcount == 1
+            conn.execute('COMMIT')
+            return added
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def _cleanup(self, conn):
+        # Expired entries first, then the soonest-expiring ones (tag tokens last) over the cap
+        conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        conn.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                     'ORDER BY expires IS NULL, expires LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?))',
+                     (self.max_entries,))
+
+class RedisError(Exception):
+    pass
+
+class RedisBackend:
+    """Minimal RESP client: GET/MGET, SET (PX, NX) and DEL over one socket per thread"""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=1.0):
+        self.address = (host, port)
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        self.local.sock, self.local.reader = sock, sock.makefile('rb')
+        if self.password:
+            self._roundtrip('AUTH', self.password)
+        if self.db:
+            self._roundtrip('SELECT', self.db)
+
+    def _close(self):
+        sock = getattr(self.local, 'sock', None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self.local.sock = None
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read_reply(self):
+        line = self.local.reader.readline()
+        if not line:
+            raise ConnectionError('Redis connection closed')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.local.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f'Unexpected reply: {line!r}')
+
+    def _roundtrip(self, *args):
+        self.local.sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def command(self, *args):
+        """Send one command; reconnects once if the connection went away"""
+        for attempt in (1, 2):
+            try:
+                if getattr(self.local, 'sock', None) is None:
+                    self._connect()
+                return self._roundtrip(*args)
+            except (OSError, ConnectionError):
+                self._close()
+                if attempt == 2:
+                    raise
+
+    def get_many(self, keys):
+        return self.command('MGET', *keys)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.command('SET', key, value, 'PX', int(ttl * 1000))
+        else:
+            self.command('SET', key, value)
+
+    def add(self, key, value, ttl=None):
+        args = ('PX', int(ttl * 1000)) if ttl else ()
+        return self.command('SET', key, value, *args, 'NX') is not None
+
+    def delete(self, key):
+        self.command('DEL', key)
+
+def create_backend(url):
+    """Backend for a CACHE_URL (see the module docstring)"""
+    parsed = urlparse(url)
+    options = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+    if parsed.scheme == 'memory':
+        return MemoryBackend(int(options.get('max_entries', 2000)))
+    if parsed.scheme == 'sqlite':
+        os.makedirs(os.path.dirname(parsed.path), exist_ok=True)
+        return SQLiteBackend(parsed.path, int(options.get('max_entries', 20000)))
+    if parsed.scheme == 'redis':
+        return RedisBackend(parsed.hostname or 'localhost', parsed.port or 6379,
+                            int(parsed.path.lstrip('/') or 0), parsed.password,
+                            float(options.get('timeout', 1.0)))
+    raise ValueError(f"Unsupported CACHE_URL scheme: {parsed.scheme!r}")
+
+# ==================== CACHE ====================
+
+class Uncacheable(Exception):
+    """Raised by a fill function to return ``value`` without caching it (errors, redirects)"""
+
+    def __init__(self, value):
+        super().__init__('uncacheable result')
+        self.value = value
+
+class Cache:
+    """Tagged get/set over a backend, with stampede protection and statistics.
+
+    Backend failures are logged and treated as misses: the cache never takes
+    a page down with it.
+    """
+
+    def __init__(self, backend, namespace='clubs', default_ttl=300, lock_timeout=10.0):
+        self.backend = backend
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.lock_timeout = lock_timeout
+        self.flights = SingleFlight(timeout=lock_timeout * 3)
+        self.counts = {'hits': 0, 'misses': 0, 'stale': 0, 'fills': 0, 'waited': 0,
+                       'invalidations': 0, 'errors': 0}
+
+    def _key(self, key):
+        return f'{self.namespace}:{key}'
+
+    def _tag_key(self, tag):
+        return f'{self.namespace}:tag:{tag}'
+
+    def _error(self, action, error):
+        self.counts['errors'] += 1
+        logger.error(f"Cache {action} failed: {str(error)}")
+
+    def _tag_tokens(self, tags, stored):
+        """Current token of each tag, creating tokens for tags seen for the first time"""
+        tokens = {}
+        for tag, token in zip(tags, stored):
+            if token is None:
+                token = uuid.uuid4().hex.encode()
+                if not self.backend.add(self._tag_key(tag), token):
+                    token = self.backend.get_many([self._tag_key(tag)])[0] or token
+            tokens[tag] = token.decode() if isinstance(token, bytes) else token
+        return tokens
+
+    def lookup(self, key, tags=()):
+        """``(hit, value, tag tokens)``; the tokens are what a fill should be stored under"""
+        tags = sorted(set(tags))
+        try:
+            entry, *stored = self.backend.get_many([self._key(key)] + [self._tag_key(tag) for tag in tags])
+            tokens = self._tag_tokens(tags, stored)
+            entry = json.loads(entry) if entry is not None else None
+        except Exception as e:
+            self._error('read', e)
+            return False, None, None
+        if entry is not None:
+            if entry['tags'] == tokens:
+                self.counts['hits'] += 1
+                return True, entry['value'], tokens
+            self.counts['stale'] += 1
+        self.counts['misses'] += 1
+        return False, None, tokens
+
+    def get(self, key, tags=()):
+        return self.lookup(key, tags)[1]
+
+    def set(self, key, value, tags=(), ttl=None, tokens=None):
+        """Store ``value`` (JSON-serializable) under ``tags``; pass the ``tokens``
+        from a lookup made before computing it, so an invalidation in between wins"""
+        try:
+            if tokens is None:
+                tags = sorted(set(tags))
+                stored = self.backend.get_many([self._tag_key(tag) for tag in tags]) if tags else []
+                tokens = self._tag_tokens(tags, stored)
+            payload = json.dumps({'value': value, 'tags': tokens}).encode()
+            self.backend.set(self._key(key), payload, ttl or self.default_ttl)
+        except Exception as e:
+            self._error('write', e)
+
+    def get_or_set(self, key, fn, tags=(), ttl=None):
+        """Cached value of ``fn()``. Concurrent misses in this process share one
+        call; other processes wait (up to ``lock_timeout``) for the one filling it."""
+        hit, value, tokens = self.lookup(key, tags)
+        if hit:
+            return value
+        return self.flights.do(key, lambda: self._fill(key, fn, tags, ttl, tokens))
+
+    def _fill(self, key, fn, tags, ttl, tokens):
+        lock_key = self._key(f'lock:{key}')
+        try:
+            locked = self.backend.add(lock_key, b'1', self.lock_timeout)
+        except Exception as e:
+            self._error('lock', e)
+            locked = True
+        if not locked:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                hit, value, _ = self.lookup(key, tags)
+                if hit:
+                    self.counts['waited'] += 1
+                    return value
+            # The other filler is slow or gone: compute it ourselves
+
+        try:
+            try:
+                value = fn()
+            except Uncacheable as e:
+                return e.value
+            self.counts['fills'] += 1
+            if tokens is not None:
+                self.set(key, value, tags, ttl, tokens)
+            return value
+        finally:
+            if locked:
+                try:
+                    self.backend.delete(lock_key)
+                except Exception as e:
+                    self._error('unlock', e)
+
+    def invalidate(self, tags):
+        """Make every entry stored under any of ``tags`` stale"""
+        for tag in set(tags):
+            try:
+                self.backend.set(self._tag_key(tag), uuid.uuid4().hex.encode())
+                self.counts['invalidations'] += 1
+            except Exception as e:
+                self._error('invalidate', e)
+
+    def stats(self):
+        lookups = self.counts['hits'] + self.counts['misses']
+        return {'backend': type(self.backend).__name__, **self.counts,
+                'coalesced': self.flights.coalesced,
+                'hit_rate': round(self.counts['hits'] / lookups, 3) if lookups else None}
+
+    def install_hooks(self, session_class, tags_for_change):
+        """Invalidate ``tags_for_change(obj, deleted)`` of every committed flush of ``session_class``"""
+
+        @event.listens_for(session_class, 'after_flush')
+        def collect_tags(session, flush_context):
+            tags = session.info.setdefault('cache_tags', set())
+            for obj in list(session.new) + list(session.dirty):
+                tags |= tags_for_change(obj)
+            for obj in session.deleted:
+                tags |= tags_for_change(obj, deleted=True)
+
+        @event.listens_for(session_class, 'after_commit')
+        def invalidate_tags(session):
+            tags = session.info.pop('cache_tags', None)
+            if tags:
+                self.invalidate(tags)
+
+        @event.listens_for(session_class, 'after_rollback')
+        def discard_tags(session):
+            session.info.pop('cache_tags', None)
+
+def create_cache(url, **options):
+    """Cache over the CACHE_URL backend, falling back to an in-process LRU"""
+    try:
+        backend = create_backend(url)
+    except Exception as e:
+        logger.error(f"Falling back to an in-process cache: {e}")
+        backend = MemoryBackend()
+    return Cache(backend, **options)
@@ -0,0 +1,223 @@
+"""Change-data-capture log behind the incremental sync feed.
+
+Every flush that touches a club (or its "why join" reasons and gallery),
+a member or an event appends ``change_log`` rows in the same transaction,
+so a version exists exactly when its change committed. Clients sync with
+
+    GET /api/changes?since=<version they have>
+
+and get the current state of each row changed since then (or a tombstone),
+plus the version to ask from next time. Compaction drops entries that a
+newer entry for the same row supersedes, and tombstones older than the
+retention; a client older than the dropped tombstones is told to reset.
+
+    python changes.py compact     # e.g. from cron, in addition to the automatic runs
+"""
+import sys
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event, insert, select, delete, func
+from sqlalchemy.orm import aliased, selectinload
+from database import lock_feed_order
+from models import db, Club, ClubMember, ClubWhyJoinReason, ClubGalleryImage, Event, ChangeLogEntry, ChangeLogState
+
+logger = logging.getLogger(__name__)
+
+def change_key(obj):
+    """``(entity, id)`` of the sync row a flushed ``obj`` belongs to, or None"""
+    if isinstance(obj, Club):
+        return ('club', obj.id)
+    if isinstance(obj, ClubMember):
+        return ('member', obj.id)
+    if isinstance(obj, Event):
+        return ('event', obj.id)
+    if isinstance(obj, (ClubWhyJoinReason, ClubGalleryImage)) and obj.club_id:
+        # Part of the club's payload
+        return ('club', obj.club_id)
+    return None
+
+# ==================== PAYLOADS ====================
+
+def club_payload(club):
+    return {
+        'id': club.id,
+        'name': club.name,
+        'logo_filename': club.logo_filename or '',
+        'members_count': club.members_count or 0,
+        'description': club.description or '',
+        'is_recruiting': bool(club.is_recruiting),
+        'application_link': club.application_link or '',
+        'why_join_reasons': [item.reason for item in club.why_join_reasons]
+    }
+
+def member_payload(member):
+    return {
+        'id': member.id,
+        'club_id': member.club_id,
+        'name': member.name,
+        'role': member.role,
+        'joined_at': member.joined_at.isoformat() if member.joined_at else None
+    }
+
+def event_payload(event):
+    return {**event.to_dict(), 'description': event.description}
+
+# entity -> (model, eager-load options, payload builder)
+ENTITIES = {
+    'club': (Club, (selectinload(Club.why_join_reasons),), club_payload),
+    'member': (ClubMember, (), member_payload),
+    'event': (Event, (), event_payload),
+}
+
+class ChangeLog:
+    """Appends change entries on flush and serves and compacts the feed"""
+
+    def __init__(self, app, retention_days=30, compact_interval=3600):
+        self.app = app
+        self.retention = timedelta(days=retention_days)
+        self.compact_interval = compact_interval
+        # The first compaction is due an interval after start-up, not on the first
+        # commit, where it would race the writer (e.g. init_db.py seeding)
+        self.last_compact = time.monotonic()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='change-log')
+
+    # ==================== WRITING ====================
+
+    def record(self, session, entity, ids, op='upsert'):
+        """Append entries for ``ids`` in ``session``'s transaction; for writes the
+        flush never sees, such as bulk UPDATEs"""
+        ids = list(ids)
+        if not ids:
+            return
+        conn = session.connection()
+        # Versions must become visible in order, or a client could skip one
+        lock_feed_order(conn)
+        conn.execute(insert(ChangeLogEntry), [
+            {'entity': entity, 'entity_id': entity_id, 'op': op, 'changed_at': datetime.utcnow()}
+            for entity_id in ids
+        ])
+
+    def install_hooks(self, session_class):
+        """Log every flushed change of ``session_class``; compact after commits when due"""
+
+        @event.listens_for(session_class, 'after_flush')
+        def log_flushed_changes(session, flush_context):
+            deleted = {change_key(obj) for obj in session.deleted if isinstance(obj, (Club, ClubMember, Event))}
+            upserted = {change_key(obj) for obj in session.new}
+            upserted |= {change_key(obj) for obj in session.dirty
+                         if session.is_modified(obj, include_collections=False)}
+            # Child rows of a deleted club log the club too; the tombstone wins
+            upserted |= {change_key(obj) for obj in session.deleted}
+            upserted -= deleted | {None}
+            deleted.discard(None)
+            for op, keys in (('upsert', upserted), ('delete', deleted)):
+                for entity in ENTITIES:
+                    self.record(session, entity, sorted(i for e, i in keys if e == entity), op)
+
+        @event.listens_for(session_class, 'after_commit')
+        def compact_when_due(session):
+            if time.monotonic() - self.last_compact > self.compact_interval:
+                self.last_compact = time.monotonic()
+                self.executor.submit(self._compact_in_background)
+
+    # ==================== READING ====================
+
+    def changes_since(self, session, since, limit):
+        """Feed page after version ``since``: the latest change of each row, oldest first"""
+        current = session.scalar(select(func.coalesce(func.max(ChangeLogEntry.version), 0)))
+        horizon = session.scalar(select(ChangeLogState.compacted_through)) or 0
+        # Older than the dropped tombstones, or ahead of this database (restored
+        # from a backup): the client must drop its copy and sync from scratch
+        reset = since > current or 0 < since < horizon
+        if reset:
+            since = 0
+
+        latest = (select(func.max(ChangeLogEntry.version).label('version'))
+                  .where(ChangeLogEntry.version > since, ChangeLogEntry.version <= current)
+                  .group_by(ChangeLogEntry.entity, ChangeLogEntry.entity_id)
+                  .subquery())
+        entries = session.execute(
+            select(ChangeLogEntry.version, ChangeLogEntry.entity, ChangeLogEntry.entity_id, ChangeLogEntry.op)
+            .join(latest, ChangeLogEntry.version == latest.c.version)
+            .order_by(ChangeLogEntry.version)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        rows = {}
+        for entity, (model, options, payload) in ENTITIES.items():
+            ids = [entry.entity_id for entry in entries if entry.entity == entity and entry.op == 'upsert']
+            if ids:
+                for obj in session.scalars(select(model).options(*options).where(model.id.in_(ids))):
+                    rows[(entity, obj.id)] = payload(obj)
+
+        changes = []
+        for entry in entries:
+            change = {'version': entry.version, 'entity': entry.entity, 'id': entry.entity_id}
+            data = rows.get((entry.entity, entry.entity_id))
+            if entry.op == 'upsert' and data is not None:
+                change.update(op='upsert', data=data)
+            else:
+                # Deleted, or deleted after ``current`` (its tombstone comes next sync)
+                change['op'] = 'delete'
+            changes.append(change)
+
+        return {
+            'version': entries[-1].version if has_more else current,
+            'has_more': has_more,
+            'reset': reset,
+            'changes': changes
+        }
+
+    # ==================== COMPACTION ====================
+
+    def compact(self):
+        """Drop superseded entries and expired tombstones older than the retention (needs an app context)"""
+        cutoff = datetime.utcnow() - self.retention
+        newer = aliased(ChangeLogEntry)
+        with db.engine.begin() as conn:
+            superseded = conn.execute(
+                delete(ChangeLogEntry)
+                .where(ChangeLogEntry.changed_at < cutoff)
+                .where(select(newer.version)
+                       .where(newer.entity == ChangeLogEntry.entity,
+                              newer.entity_id == ChangeLogEntry.entity_id,
+                              newer.version > ChangeLogEntry.version)
+                       .exists())
+            ).rowcount
+            tombstones = ((ChangeLogEntry.op == 'delete') & (ChangeLogEntry.changed_at < cutoff))
+            horizon = conn.scalar(select(func.max(ChangeLogEntry.version)).where(tombstones))
+            expired = conn.execute(delete(ChangeLogEntry).where(tombstones)).rowcount if horizon else 0
+
+            state = conn.execute(select(ChangeLogState.compacted_through)).first()
+            if state is None:
+                conn.execute(insert(ChangeLogState).values(id=1, compacted_through=horizon or 0,
+                                                           compacted_at=datetime.utcnow()))
+            else:
+                conn.execute(ChangeLogState.__table__.update()
+                             .values(compacted_through=max(state.compacted_through, horizon or 0),
+                                     compacted_at=datetime.utcnow()))
+        logger.info(f"Change log compacted: {superseded} superseded entries and {expired} tombstones removed")
+        return {'superseded': superseded, 'tombstones': expired}
+
+    def _compact_in_background(self):
+        with self.lock, self.app.app_context():
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Change log compaction failed: {str(e)}", exc_info=True)
+
+if __name__ == '__main__':
+    from app import app, change_log
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'compact':
+        with app.app_context():
+            stats = change_log.compact()
+        print(f"✓ {stats['superseded']} superseded entries and {stats['tombstones']} tombstones removed")
+    else:
+        print("Usage: python changes.py compact")
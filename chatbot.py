@@ -1,14 +1,27 @@
 import os
+import threading
 import json
+import logging
 from datetime import datetime
 from huggingface_hub import InferenceClient
+from database import read_replica
+from prompt_budget import TokenCounter, PromptAssembler, summarize_exchange
+from cache import Uncacheable
+from read_models import ChatbotClub, ChatbotEvent
+
+logger = logging.getLogger(__name__)
 
 class ClubChatbot:
     """AI Chatbot for club and event information using Hugging Face"""
     
-    def __init__(self, hf_token=None):
+    # The context lists every club and event; managers' commits invalidate these tags
+    CONTEXT_TAGS = ('clubs', 'events')
+    
+    def __init__(self, hf_token=None, cache=None):
         """Initialize the chatbot with Hugging Face API"""
         self.hf_token = hf_token or os.environ.get('HUGGINGFACE_API_TOKEN')
+        self.cache = cache
+        self.context_ttl = int(os.environ.get('CHATBOT_CONTEXT_TTL', 600))
         
         # Initialize Hugging Face Inference Client
         # Using Mistral-7B-Instruct-v0.2 - FREE on Hugging Face Inference API
@@ -18,23 +31,52 @@ class ClubChatbot:
         # - "HuggingFaceH4/zephyr-7b-beta"
         # - "tiiuae/falcon-7b-instruct"
         
+        self.model = "mistralai/Mistral-7B-Instruct-v0.2"
+        
         try:
             self.client = InferenceClient(
-                model="mistralai/Mistral-7B-Instruct-v0.2",
+                model=self.model,
                 token=self.hf_token
             )
-            print("✓ Chatbot initialized with Mistral-7B-Instruct-v0.2")
+            logger.info("✓ Chatbot initialized with Mistral-7B-Instruct-v0.2")
         except Exception as e:
-            print(f"✗ Error initializing chatbot: {e}")
+            logger.error(f"✗ Error initializing chatbot: {e}")
             self.client = None
         
         self.conversation_history = []
-        self.max_history = 5  # Keep last 5 exchanges
+        self.max_history = 5  # Keep last 5 exchanges verbatim
+        self.history_summary = []  # One line per older, compacted exchange
+        # Requests run on many threads: history is snapshotted and updated
+        # under this lock, but the model call happens outside it
+        self.history_lock = threading.Lock()
+        
+        # Prompt token budget: system prompt + summary + history + question,
+        # plus room for the reply
+        self.max_reply_tokens = 250
+        self.token_counter = TokenCounter(self.model, hf_token=self.hf_token)
+        self.prompt_assembler = PromptAssembler(
+            self.token_counter,
+            budget=int(os.environ.get('CHATBOT_PROMPT_TOKEN_BUDGET', 3000)),
+            reply_tokens=self.max_reply_tokens,
+            summary_tokens=int(os.environ.get('CHATBOT_SUMMARY_TOKEN_BUDGET', 300))
+        )
     
     def get_database_context(self, db):
-        """Extract relevant information from database"""
-        from app import Club, Event
+        """Database context for the prompt, from the shared cache when one is configured"""
+        if self.cache is None:
+            return self.load_database_context(db)
+        
+        def load():
+            context = self.load_database_context(db)
+            if not context['stats']:
+                # The database could not be read: answer from it, but do not keep it
+                raise Uncacheable(context)
+            return context
         
+        return self.cache.get_or_set('chatbot:context', load, tags=self.CONTEXT_TAGS, ttl=self.context_ttl)
+    
+    def load_database_context(self, db):
+        """Extract relevant information from database"""
         context = {
             'clubs': [],
             'events': [],
@@ -42,29 +84,13 @@ class ClubChatbot:
         }
         
         try:
-            # Get all clubs
-            clubs = Club.query.all()
-            for club in clubs:
-                context['clubs'].append({
-                    'name': club.name,
-                    'description': club.description,
-                    'members_count': club.members_count,
-                    'is_recruiting': club.is_recruiting,
-                    'application_link': club.application_link
-                })
+            # Read-only: served from the replica when one is configured
+            with read_replica():
+                clubs = ChatbotClub.all(ChatbotClub.query())
+                events = ChatbotEvent.all(ChatbotEvent.query())
             
-            # Get all events
-            events = Event.query.all()
-            for event in events:
-                context['events'].append({
-                    'title': event.title,
-                    'description': event.description,
-                    'category': event.category,
-                    'date': event.date,
-                    'time': event.time,
-                    'location': event.location,
-                    'organizer': event.organizer
-                })
+            context['clubs'] = [club.to_dict() for club in clubs]
+            context['events'] = [event.to_dict() for event in events]
             
             # Calculate stats
             context['stats'] = {
@@ -75,7 +101,7 @@ class ClubChatbot:
             }
             
         except Exception as e:
-            print(f"Error fetching database context: {e}")
+            logger.error(f"Error fetching database context: {e}", exc_info=True)
         
         return context
     
@@ -126,63 +152,89 @@ Answer the student's question based on the information provided above."""
     
     def generate_response(self, user_message, db):
         """Generate response using Hugging Face API"""
+        response, _ = self.generate_response_with_usage(user_message, db)
+        return response
+    
+    def generate_response_with_usage(self, user_message, db):
+        """Generate a response and report the prompt's token usage"""
         if not self.client:
-            return "Sorry, the chatbot service is currently unavailable. Please try again later! 🔄"
+            return "Sorry, the chatbot service is currently unavailable. Please try again later! 🔄", None
         
         try:
             # Get fresh database context
             context = self.get_database_context(db)
             system_prompt = self.build_system_prompt(context)
             
-            # Build conversation messages
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add conversation history (keep it short)
-            for msg in self.conversation_history[-self.max_history:]:
-                messages.append(msg)
+            with self.history_lock:
+                history, summary = list(self.conversation_history), list(self.history_summary)
             
-            # Add current user message
-            messages.append({"role": "user", "content": user_message})
+            # Fit system prompt, running summary, recent history and the
+            # question into the token budget; the state only changes once
+            # the model has answered
+            messages, kept_history, _, usage = self.prompt_assembler.assemble(
+                system_prompt, history, summary, user_message
+            )
             
             # Generate response
             response = ""
             try:
                 for message in self.client.chat_completion(
                     messages=messages,
-                    max_tokens=250,
+                    max_tokens=self.max_reply_tokens,
                     temperature=0.7,
                     stream=True
                 ):
                     if message.choices[0].delta.content:
                         response += message.choices[0].delta.content
             except Exception as stream_error:
-                print(f"Streaming error: {stream_error}")
+                logger.warning(f"Streaming error: {stream_error}")
                 # Fallback to non-streaming
                 result = self.client.chat_completion(
                     messages=messages,
-                    max_tokens=250,
+                    max_tokens=self.max_reply_tokens,
                     temperature=0.7,
                     stream=False
                 )
                 response = result.choices[0].message.content
             
-            # Update conversation history
-            self.conversation_history.append({"role": "user", "content": user_message})
-            self.conversation_history.append({"role": "assistant", "content": response})
+            usage['completion_tokens'] = self.token_counter.count(response)
             
-            # Keep only recent history
-            if len(self.conversation_history) > self.max_history * 2:
-                self.conversation_history = self.conversation_history[-self.max_history * 2:]
+            # Update conversation history, on top of whatever concurrent
+            # requests recorded meanwhile
+            dropped = history[:len(history) - len(kept_history)]
+            with self.history_lock:
+                if dropped and self.conversation_history[:len(dropped)] == dropped:
+                    # Left out of the prompt for the budget: fold them now,
+                    # unless a concurrent request already did
+                    self._fold(len(dropped))
+                self.conversation_history = self.conversation_history + [
+                    {"role": "user", "content": user_message},
+                    {"role": "assistant", "content": response}
+                ]
+                
+                # Fold exchanges beyond max_history into the running summary
+                if len(self.conversation_history) > self.max_history * 2:
+                    self._fold(len(self.conversation_history) - self.max_history * 2)
             
-            return response.strip()
+            return response.strip(), usage
             
         except Exception as e:
-            print(f"Error generating response: {e}")
-            return "I'm having trouble connecting right now. Please try again in a moment! 🔄"
+            logger.error(f"Error generating response: {e}", exc_info=True)
+            return "I'm having trouble connecting right now. Please try again in a moment! 🔄", None
+    
+    def _fold(self, count):
+        """Move the oldest ``count`` history messages into the running summary (holding history_lock)"""
+        folded, self.conversation_history = self.conversation_history[:count], self.conversation_history[count:]
+        self.history_summary = self.prompt_assembler.compact_summary(
+            self.history_summary + [summarize_exchange(user['content'], assistant['content'])
+                                    for user, assistant in zip(folded[::2], folded[1::2])]
+        )
     
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        with self.history_lock:
+            self.conversation_history = []
+            self.history_summary = []
     
     def get_quick_suggestions(self, context):
         """Get quick reply suggestions based on context"""
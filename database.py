@@ -0,0 +1,171 @@
+import os
+import logging
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, request, has_request_context, current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# ==================== POOL SIZING ====================
+
+def normalize_database_url(url):
+    """Heroku/Render style postgres:// URLs need the postgresql:// scheme"""
+    if url and url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+def server_engine_options(prefix='DB'):
+    """Pool options for a server database, read from <prefix>_POOL_* variables"""
+    return {
+        'pool_pre_ping': True,
+        'pool_size': int(os.environ.get(f'{prefix}_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get(f'{prefix}_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get(f'{prefix}_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get(f'{prefix}_POOL_RECYCLE', 300)),
+    }
+
+# ==================== SQLITE PRODUCTION MODE ====================
+
+# Pragmas applied to every new SQLite connection. WAL lets readers run
+# alongside the single writer, NORMAL sync is safe with WAL, and the
+# mmap/cache sizes keep hot pages out of the read() path.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024)),  # negative = KiB
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'temp_store': 'MEMORY',
+}
+
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 5))
+SQLITE_MAX_OVERFLOW = int(os.environ.get('SQLITE_MAX_OVERFLOW', 10))
+
+def is_sqlite_file_url(url):
+    """True when the database URL points at a file-backed SQLite database"""
+    url = str(url)
+    return url.startswith('sqlite') and ':memory:' not in url and url.rstrip('/') != 'sqlite:'
+
+def sqlite_engine_options():
+    """Engine options for a file-backed SQLite database"""
+    return {
+        'poolclass': QueuePool,
+        'pool_size': SQLITE_POOL_SIZE,
+        'max_overflow': SQLITE_MAX_OVERFLOW,
+        'connect_args': {
+            # sqlite3's own lock wait, in seconds; mirrors busy_timeout
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            'check_same_thread': False,
+            # Let SQLAlchemy (not pysqlite) decide when transactions begin
+            'isolation_level': None,
+        },
+    }
+
+def mark_write_intent():
+    """Flag the current request as a writer so its transaction takes the write lock up front"""
+    if has_request_context():
+        g.db_write_intent = True
+
+def configure_sqlite_engine(engine):
+    """Attach pragma and transaction-begin listeners to a SQLite engine"""
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin_sqlite_transaction(connection):
+        # Writers take the RESERVED lock immediately, so concurrent writers
+        # queue on busy_timeout instead of failing when a read lock is
+        # upgraded mid-transaction. Readers stay deferred and, under WAL,
+        # never block or get blocked.
+        if has_request_context() and g.get('db_write_intent'):
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+        else:
+            connection.exec_driver_sql('BEGIN')
+
+    logger.info(f"SQLite tuned: journal_mode={SQLITE_PRAGMAS['journal_mode']}, "
+                f"synchronous={SQLITE_PRAGMAS['synchronous']}, pool_size={SQLITE_POOL_SIZE}")
+
+# ==================== READ/WRITE ROUTING ====================
+
+REPLICA_BIND_KEY = 'replica'
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica when the request opted in.
+
+    A session only uses the replica while ``info['use_replica']`` is set and
+    it has not flushed yet; once it writes, every later read in the same
+    session goes to the primary so it sees its own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None
+                and self.info.get('use_replica')
+                and not self.info.get('wrote')
+                and not self._flushing):
+            engine = self._db.engines.get(REPLICA_BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def pin_session_to_primary(session, flush_context):
+    session.info['wrote'] = True
+
+@contextmanager
+def read_replica():
+    """Route reads in the current session to the replica for the duration of the block"""
+    session = current_app.extensions['sqlalchemy'].session
+    previous = session.info.get('use_replica', False)
+    session.info['use_replica'] = True
+    try:
+        yield session
+    finally:
+        session.info['use_replica'] = previous
+
+@contextmanager
+def read_primary():
+    """Route reads in the current session to the primary for the duration of the block, even inside read_replica()"""
+    session = current_app.extensions['sqlalchemy'].session
+    previous = session.info.get('use_replica', False)
+    session.info['use_replica'] = False
+    try:
+        yield session
+    finally:
+        session.info['use_replica'] = previous
+
+# ==================== ORDERED FEEDS ====================
+
+def lock_feed_order(conn):
+    """Hold the feed-order lock until ``conn``'s transaction ends.
+
+    The change log and live updates hand out sequence ids that readers
+    consume as ``id > last seen``. On PostgreSQL a later id could commit
+    before an earlier one and be skipped for good, so every writer to
+    those tables takes this lock before drawing an id. SQLite already
+    allows a single writer."""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('LOCK TABLE change_log IN SHARE ROW EXCLUSIVE MODE'))
+
+# Set in the WSGI environ of internal requests that must see the latest
+# commit (e.g. the static exporter rendering a page right after a save)
+PRIMARY_ONLY_ENVIRON = 'clubs.primary_only'
+
+def read_only_route(fn):
+    """Decorator for public, read-only views that may be served from the replica"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if request.environ.get(PRIMARY_ONLY_ENVIRON):
+            return fn(*args, **kwargs)
+        with read_replica():
+            return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,155 @@
+"""Background dependency checks behind the liveness and readiness probes.
+
+Probes never touch a dependency themselves: a checker thread per worker
+runs every registered check on its own interval (each in a pool thread,
+so one hung upstream cannot hold up the others) and probes report the
+last results, with their latency and age.
+
+    /livez     200 while the process can answer at all
+    /readyz    200 when ready or degraded, 503 when starting or unready
+
+A failing critical check makes the worker unready; a failing optional
+one (such as the inference upstream) only marks it degraded. A critical
+result older than ``stale_after`` counts as failed, so a checker stuck
+on a hung connection takes the worker out of rotation too.
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class CheckDisabled(Exception):
+    """Raised by a check whose dependency is not configured in this deployment"""
+
+class Check:
+    def __init__(self, name, fn, critical, interval):
+        self.name = name
+        self.fn = fn
+        self.critical = critical
+        self.interval = interval
+        self.running_since = None
+        self.next_run = 0.0
+        self.result = None
+
+class HealthMonitor:
+    """Runs registered checks in the background; probes read the cached results"""
+
+    TICK = 0.5
+
+    def __init__(self, app, interval=15, timeout=5, stale_after=None):
+        self.app = app
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after or interval * 3 + timeout
+        self.checks = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.executor = None
+        self.started_at = time.time()
+
+    def register(self, name, fn, critical=True, interval=None):
+        """Check ``fn()`` every ``interval`` seconds; it raises on failure and may return details"""
+        self.checks[name] = Check(name, fn, critical, interval or self.interval)
+
+    # ==================== CHECKER ====================
+
+    def ensure_started(self):
+        # Started lazily so it lives in the worker process, not a pre-fork parent
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=max(len(self.checks), 1),
+                                                       thread_name_prefix='health-check')
+                self.thread = threading.Thread(target=self._check_forever, daemon=True, name='health-checker')
+                self.thread.start()
+
+    def _check_forever(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Health checker failed: {str(e)}", exc_info=True)
+            time.sleep(self.TICK)
+
+    def tick(self):
+        """Start every check that is due and not still running"""
+        now = time.monotonic()
+        for check in self.checks.values():
+            with self.lock:
+                if check.running_since is not None or now < check.next_run:
+                    continue
+                check.running_since = now
+            try:
+                self.executor.submit(self._run, check)
+            except RuntimeError:
+                # The interpreter is shutting down
+                return
+
+    def _run(self, check):
+        started = time.perf_counter()
+        error, details = None, {}
+        try:
+            with self.app.app_context():
+                details = check.fn() or {}
+            status = 'ok'
+        except CheckDisabled as e:
+            status, error = 'disabled', str(e)
+        except Exception as e:
+            status, error = 'fail', str(e) or type(e).__name__
+        result = {'status': status, 'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+                  'checked_at': time.time(), 'error': error, 'details': details}
+        with self.lock:
+            previous = check.result['status'] if check.result else None
+            check.result = result
+            check.running_since = None
+            check.next_run = time.monotonic() + check.interval
+        if status != previous and (status == 'fail' or previous == 'fail'):
+            log = logger.warning if status == 'fail' else logger.info
+            log(f"Health check {check.name}: {previous or 'pending'} -> {status}" + (f" ({error})" if error else ''))
+
+    # ==================== PROBES ====================
+
+    def _report(self, check, now, wall_now):
+        with self.lock:
+            result, running_since = check.result, check.running_since
+        report = {'critical': check.critical}
+        if result is None:
+            report['status'] = 'pending'
+        else:
+            report.update(status=result['status'], latency_ms=result['latency_ms'],
+                          age_s=round(wall_now - result['checked_at'], 1))
+            if result['error']:
+                report['error'] = result['error']
+            if result['details']:
+                report['details'] = result['details']
+            if report['age_s'] > max(self.stale_after, check.interval * 3):
+                report.update(status='fail', error=f"stale: last result {report['age_s']:.0f}s old")
+        if running_since is not None and now - running_since > self.timeout:
+            # Still running: report the hang instead of the last result
+            report.update(status='fail', error=f'timed out after {self.timeout}s',
+                          latency_ms=round((now - running_since) * 1000, 1))
+        return report
+
+    def status(self):
+        """Last-known state of every check and the overall verdict; never blocks on a dependency"""
+        self.ensure_started()
+        now, wall_now = time.monotonic(), time.time()
+        checks = {name: self._report(check, now, wall_now) for name, check in self.checks.items()}
+        critical = [report['status'] for report in checks.values() if report['critical']]
+        optional = [report['status'] for report in checks.values() if not report['critical']]
+        if 'fail' in critical:
+            overall = 'unready'
+        elif 'pending' in critical:
+            overall = 'starting'
+        elif 'fail' in optional:
+            overall = 'degraded'
+        else:
+            overall = 'ready'
+        return {'status': overall, 'ready': overall in ('ready', 'degraded'), 'checks': checks}
+
+    def liveness(self):
+        self.ensure_started()
+        return {'status': 'alive', 'uptime_s': round(time.time() - self.started_at, 1),
+                'checker': self.thread is not None and self.thread.is_alive()}
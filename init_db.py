@@ -1,9 +1,10 @@
 from app import app, db, Club, Event
+from migrations import upgrade
 
 def init_database():
     with app.app_context():
-        print("Creating database tables...")
-        db.create_all()
+        print("Creating database tables and applying migrations...")
+        upgrade(db)
         
         # Seed clubs if empty
         if Club.query.count() == 0:
@@ -135,8 +136,10 @@ def init_database():
                 }
             ]
             
+            # Link each event to its organizing club by name
+            club_ids = {club.name: club.id for club in Club.query.all()}
             for event_data in events_data:
-                event = Event(**event_data)
+                event = Event(**event_data, organizer_club_id=club_ids.get(event_data['organizer']))
                 db.session.add(event)
             
             db.session.commit()
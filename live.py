@@ -0,0 +1,168 @@
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from models import LiveUpdate
+from database import lock_feed_order
+
+logger = logging.getLogger(__name__)
+
+# Sent to a subscriber that fell too far behind; the page reloads once
+RESET = object()
+
+class Subscriber:
+    def __init__(self, topics, queue_size):
+        self.topics = topics
+        self.queue = queue.Queue(maxsize=queue_size)
+
+    def offer(self, item):
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+class LiveBroker:
+    """Fans committed catalog changes out to Server-Sent Event streams.
+
+    Manager routes add a ``live_updates`` row in the same transaction as
+    their change, so only committed changes are announced and every worker
+    sees them. Each worker runs one poller thread (only while it has
+    subscribers) that reads new rows and hands them to its local streams.
+    Row ids double as SSE event ids, so a reconnecting browser resumes with
+    Last-Event-ID instead of reloading the page. Publishers take the feed
+    order lock before drawing an id, so ids become visible in order and the
+    ``id > high_water`` poll never skips one.
+    """
+
+    BATCH = 200
+
+    def __init__(self, app, db, poll_interval=1.0, retention=600, max_subscribers=8,
+                 queue_size=100, heartbeat=15, stream_seconds=300):
+        self.app = app
+        self.db = db
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.stream_seconds = stream_seconds
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.high_water = None
+        self.poller = None
+        self.last_prune = 0.0
+        self.dropped = 0
+
+    # ==================== PUBLISHING ====================
+
+    def publish(self, session, topic, payload):
+        """Queue ``payload`` on ``topic``; it goes out when ``session`` commits"""
+        lock_feed_order(session.connection())
+        session.add(LiveUpdate(topic=topic, payload=json.dumps(payload, default=str)))
+
+    # ==================== SUBSCRIBING ====================
+
+    def _fetch(self, conn, after, limit):
+        return conn.execute(text("SELECT id, topic, payload FROM live_updates "
+                                 "WHERE id > :after ORDER BY id LIMIT :limit"),
+                            {'after': after, 'limit': limit}).fetchall()
+
+    def subscribe(self, topics, last_event_id=None):
+        """Register a subscriber, replaying what it missed since ``last_event_id``; None when full"""
+        self._ensure_poller()
+        subscriber = Subscriber(set(topics), self.queue_size)
+        with self.app.app_context(), self.db.engine.connect() as conn, self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                return None
+            if self.high_water is None:
+                self.high_water = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM live_updates")).scalar()
+            if last_event_id is not None and last_event_id < self.high_water:
+                # Under the lock, so the poller cannot interleave newer rows
+                missed = self._fetch(conn, last_event_id, self.queue_size)
+                oldest = conn.execute(text("SELECT MIN(id) FROM live_updates")).scalar()
+                if len(missed) == self.queue_size or (oldest and last_event_id < oldest - 1):
+                    subscriber.offer(RESET)
+                else:
+                    for row in missed:
+                        if row.id <= self.high_water and row.topic in subscriber.topics:
+                            subscriber.offer(tuple(row))
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def stream(self, subscriber):
+        """SSE body for ``subscriber``; ends after ``stream_seconds`` so threads are recycled"""
+        deadline = time.monotonic() + self.stream_seconds
+        try:
+            yield f'retry: {int(self.poll_interval * 2000)}\n\n'
+            while time.monotonic() < deadline:
+                try:
+                    item = subscriber.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if item is RESET:
+                    yield 'event: reset\ndata: {}\n\n'
+                    return
+                update_id, topic, payload = item
+                yield f'id: {update_id}\nevent: {topic}\ndata: {payload}\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+    # ==================== POLLER ====================
+
+    def _ensure_poller(self):
+        # Started lazily so it lives in the worker process, not a pre-fork parent
+        with self.lock:
+            if self.poller is None or not self.poller.is_alive():
+                self.poller = threading.Thread(target=self._poll_forever, daemon=True, name='live-poller')
+                self.poller.start()
+
+    def _poll_forever(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Live update poll failed: {str(e)}", exc_info=True)
+
+    def poll(self):
+        """Dispatch rows committed since the last poll to local subscribers"""
+        with self.lock:
+            if not self.subscribers:
+                # Nobody listening: skip the query and re-read MAX(id) on the next subscribe
+                self.high_water = None
+                return
+        with self.app.app_context(), self.db.engine.connect() as conn:
+            with self.lock:
+                rows = self._fetch(conn, self.high_water or 0, self.BATCH)
+                for row in rows:
+                    for subscriber in list(self.subscribers):
+                        if row.topic in subscriber.topics and not subscriber.offer(tuple(row)):
+                            # Too slow to keep up: tell it to reload once and drop it
+                            self.dropped += 1
+                            self.subscribers.discard(subscriber)
+                            with subscriber.queue.mutex:
+                                subscriber.queue.queue.clear()
+                            subscriber.offer(RESET)
+                if rows:
+                    self.high_water = rows[-1].id
+            if time.monotonic() - self.last_prune > 60:
+                self.last_prune = time.monotonic()
+                self.prune()
+
+    def prune(self):
+        """Delete updates older than ``retention`` seconds (needs an app context)"""
+        with self.db.engine.begin() as conn:
+            conn.execute(text("DELETE FROM live_updates WHERE created_at < :cutoff"),
+                         {'cutoff': datetime.utcnow() - timedelta(seconds=self.retention)})
+
+    def stats(self):
+        return {'subscribers': len(self.subscribers), 'dropped': self.dropped, 'high_water': self.high_water}
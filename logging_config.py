@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from flask import g, request, has_request_context
+
+# Pass as ``extra=SAMPLED`` on high-volume success logs; only LOG_SAMPLE_RATE
+# of them are kept. Warnings and errors are never sampled.
+SAMPLED = {'sample': True}
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id', 'sample'}
+
+_stats = {'enqueued': 0, 'dropped': 0, 'sampled_out': 0}
+_listener = None
+_queue_handler = None
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the id of the request that produced them"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records logged with ``extra=SAMPLED``"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, 'sample', False) and record.levelno < logging.WARNING:
+            if random.random() >= self.rate:
+                _stats['sampled_out'] += 1
+                return False
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including request id and ``extra`` fields"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            payload['request_id'] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    def prepare(self, record):
+        # Resolve the message now (arguments may change later) but leave the
+        # formatting, JSON encoding and I/O to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            _stats['enqueued'] += 1
+        except queue.Full:
+            _stats['dropped'] += 1
+
+def parse_module_levels(spec):
+    """Parse ``"chatbot=DEBUG,sqlalchemy.engine=WARNING"`` into a dict"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging(app):
+    """Route all logging through a bounded queue drained by a background thread.
+
+    LOG_LEVEL sets the root level, LOG_LEVELS overrides it per module,
+    LOG_FORMAT picks ``json`` (default) or ``text`` and LOG_SAMPLE_RATE is the
+    fraction of SAMPLED records kept.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if os.environ.get('LOG_FORMAT', 'json').lower() == 'text':
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'))
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(float(os.environ.get('LOG_SAMPLE_RATE', 0.1))))
+    _queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    for name, level in parse_module_levels(os.environ.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+
+    @app.after_request
+    def expose_request_id(response):
+        if g.get('request_id'):
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+def logging_stats():
+    """Counters for monitoring logging overhead and loss"""
+    return {
+        **_stats,
+        'queue_depth': _queue_handler.queue.qsize() if _queue_handler else 0,
+    }
+
+def benchmark(iterations=20000):
+    """Compare per-call cost of a synchronous stdout handler with the queued one"""
+    devnull = open(os.devnull, 'w')
+    results = {}
+
+    sync_logger = logging.getLogger('bench.sync')
+    sync_logger.propagate = False
+    sync_handler = logging.StreamHandler(devnull)
+    sync_handler.setFormatter(JsonFormatter())
+    sync_logger.addHandler(sync_handler)
+
+    queued_logger = logging.getLogger('bench.queued')
+    queued_logger.propagate = False
+    bench_queue = queue.Queue(maxsize=iterations * 2)
+    queued_handler = NonBlockingQueueHandler(bench_queue)
+    queued_handler.addFilter(RequestIdFilter())
+    queued_logger.addHandler(queued_handler)
+    listener_handler = logging.StreamHandler(devnull)
+    listener_handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(bench_queue, listener_handler)
+    listener.start()
+
+    sampled_logger = logging.getLogger('bench.sampled')
+    sampled_logger.propagate = False
+    sampled_handler = NonBlockingQueueHandler(bench_queue)
+    sampled_handler.addFilter(SamplingFilter(0.1))
+    sampled_logger.addHandler(sampled_handler)
+
+    for name, bench_logger, extra in (('sync', sync_logger, None),
+                                      ('queued', queued_logger, None),
+                                      ('queued+sampled', sampled_logger, SAMPLED)):
+        bench_logger.setLevel(logging.INFO)
+        start = time.perf_counter()
+        for i in range(iterations):
+            bench_logger.info('Fetched %d events', i, extra=extra)
+        results[name] = (time.perf_counter() - start) / iterations * 1e6
+
+    listener.stop()
+    devnull.close()
+    return results
+
+if __name__ == '__main__':
+    for name, micros in benchmark().items():
+        print(f"{name:>16}: {micros:.2f} µs per log call")
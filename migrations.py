@@ -0,0 +1,259 @@
+"""Versioned schema migrations.
+
+Run at deploy time (see build.sh):
+
+    python migrations.py upgrade   # create new tables, apply pending migrations
+    python migrations.py status    # list applied and pending migrations
+    python migrations.py verify    # re-run every EXPLAIN check
+
+Brand-new tables come straight from models.py via ``db.create_all()``;
+migrations only alter tables that already exist, so each one inspects the
+schema first and is safe to run against a fresh database.
+"""
+import sys
+import json
+import logging
+import posixpath
+from datetime import datetime
+from urllib.parse import urlparse
+from sqlalchemy import inspect, text
+from models import parse_event_date
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+def migration(version, name, checks=()):
+    """Register an upgrade function. ``checks`` are ``(sql, index_name)`` pairs
+    whose query plan must use the index once the migration is applied."""
+    def decorator(fn):
+        MIGRATIONS.append({'version': version, 'name': name, 'upgrade': fn, 'checks': list(checks)})
+        MIGRATIONS.sort(key=lambda m: m['version'])
+        return fn
+    return decorator
+
+# ==================== HELPERS ====================
+
+def column_names(conn, table):
+    return {column['name'] for column in inspect(conn).get_columns(table)}
+
+def create_index(conn, name, table, columns):
+    """CREATE INDEX IF NOT EXISTS works on both SQLite and PostgreSQL"""
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+def explain(conn, sql):
+    """Query plan lines for ``sql``, or None on databases we cannot inspect"""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        return [str(row[-1]) for row in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    if dialect == 'postgresql':
+        # Small tables always get a sequential scan; turn that off so the plan
+        # shows whether the index is usable at all
+        conn.execute(text('SET LOCAL enable_seqscan = off'))
+        return [row[0] for row in conn.execute(text(f'EXPLAIN {sql}'))]
+    return None
+
+def run_checks(conn, checks):
+    """Run EXPLAIN checks; each result is (sql, index_name, passed or None, plan)"""
+    results = []
+    for sql, index_name in checks:
+        plan = explain(conn, sql)
+        passed = None if plan is None else any(index_name in line for line in plan)
+        results.append((sql, index_name, passed, plan))
+    return results
+
+# ==================== MIGRATIONS ====================
+
+@migration(1, 'hot_path_indexes', checks=[
+    ("SELECT * FROM club_members WHERE club_id = 1", 'ix_club_members_club_id'),
+    ("SELECT * FROM club_members ORDER BY joined_at DESC", 'ix_club_members_joined_at'),
+    ("SELECT * FROM events ORDER BY created_at DESC", 'ix_events_created_at'),
+    ("SELECT * FROM events WHERE category = 'Technical'", 'ix_events_category'),
+])
+def hot_path_indexes(conn):
+    create_index(conn, 'ix_club_members_club_id', 'club_members', ['club_id'])
+    create_index(conn, 'ix_club_members_joined_at', 'club_members', ['joined_at'])
+    create_index(conn, 'ix_events_created_at', 'events', ['created_at'])
+    create_index(conn, 'ix_events_category', 'events', ['category'])
+
+def parse_legacy_json_list(value):
+    """Parse a legacy JSON list column into a list of non-empty strings"""
+    if not value:
+        return []
+    try:
+        items = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(items, list):
+        return []
+    return [str(item).strip() for item in items if item and str(item).strip()]
+
+@migration(2, 'club_gallery_child_tables', checks=[
+    ("SELECT * FROM club_gallery_images WHERE club_id = 1 ORDER BY position", 'ix_club_gallery_images_club_position'),
+])
+def club_gallery_child_tables(conn):
+    """Move the legacy JSON why_join_reasons/gallery_images columns into child rows"""
+    legacy_columns = [name for name in ('why_join_reasons', 'gallery_images') if name in column_names(conn, 'clubs')]
+    if not legacy_columns:
+        return
+
+    rows = conn.execute(text(f"SELECT id, {', '.join(legacy_columns)} FROM clubs")).mappings().all()
+    for row in rows:
+        for position, reason in enumerate(parse_legacy_json_list(row.get('why_join_reasons'))):
+            conn.execute(text("INSERT INTO club_why_join_reasons (club_id, position, reason) "
+                              "VALUES (:club_id, :position, :reason)"),
+                         {'club_id': row['id'], 'position': position, 'reason': reason[:300]})
+        for position, filename in enumerate(parse_legacy_json_list(row.get('gallery_images'))):
+            conn.execute(text("INSERT INTO club_gallery_images (club_id, position, filename) "
+                              "VALUES (:club_id, :position, :filename)"),
+                         {'club_id': row['id'], 'position': position, 'filename': filename[:200]})
+    # Cleared rather than dropped so a rollback to older code still works
+    conn.execute(text(f"UPDATE clubs SET {', '.join(f'{name} = NULL' for name in legacy_columns)}"))
+
+@migration(3, 'club_logo_filename')
+def club_logo_filename(conn):
+    """Add clubs.logo_filename and backfill it from the old logo_url column"""
+    columns = column_names(conn, 'clubs')
+    if 'logo_filename' not in columns:
+        conn.execute(text("ALTER TABLE clubs ADD COLUMN logo_filename VARCHAR(200)"))
+    if 'logo_url' not in columns:
+        return
+
+    rows = conn.execute(text("SELECT id, logo_url FROM clubs "
+                             "WHERE logo_url IS NOT NULL AND logo_url != ''")).fetchall()
+    for club_id, logo_url in rows:
+        filename = posixpath.basename(urlparse(logo_url).path)
+        if filename:
+            conn.execute(text("UPDATE clubs SET logo_filename = :filename "
+                              "WHERE id = :id AND logo_filename IS NULL"),
+                         {'filename': filename[:200], 'id': club_id})
+
+@migration(4, 'event_facets', checks=[
+    ("SELECT * FROM events WHERE organizer = 'Code Warriors'", 'ix_events_organizer'),
+    ("SELECT * FROM events WHERE starts_on >= '2025-11-01'", 'ix_events_starts_on'),
+])
+def event_facets(conn):
+    """Index organizer and add a parsed, indexed starts_on date for faceted filtering"""
+    if 'starts_on' not in column_names(conn, 'events'):
+        conn.execute(text("ALTER TABLE events ADD COLUMN starts_on DATE"))
+    for event_id, event_date in conn.execute(text("SELECT id, date FROM events WHERE starts_on IS NULL")).fetchall():
+        starts_on = parse_event_date(event_date)
+        if starts_on:
+            conn.execute(text("UPDATE events SET starts_on = :starts_on WHERE id = :id"),
+                         {'starts_on': starts_on, 'id': event_id})
+    create_index(conn, 'ix_events_organizer', 'events', ['organizer'])
+    create_index(conn, 'ix_events_starts_on', 'events', ['starts_on'])
+
+@migration(5, 'event_organizer_club', checks=[
+    ("SELECT * FROM events WHERE organizer_club_id = 1 AND starts_on >= '2025-11-01' ORDER BY starts_on",
+     'ix_events_organizer_club_starts_on'),
+])
+def event_organizer_club(conn):
+    """Link events to the club that organizes them, matching organizer text to club names"""
+    if 'organizer_club_id' not in column_names(conn, 'events'):
+        conn.execute(text("ALTER TABLE events ADD COLUMN organizer_club_id INTEGER REFERENCES clubs (id)"))
+    # Case and surrounding whitespace differ between hand-typed organizers and club names
+    conn.execute(text("UPDATE events SET organizer_club_id = ("
+                      "SELECT MIN(clubs.id) FROM clubs WHERE lower(trim(clubs.name)) = lower(trim(events.organizer))) "
+                      "WHERE organizer_club_id IS NULL"))
+    create_index(conn, 'ix_events_organizer_club_starts_on', 'events', ['organizer_club_id', 'starts_on'])
+    unmatched = conn.execute(text("SELECT COUNT(*) FROM events WHERE organizer_club_id IS NULL")).scalar()
+    if unmatched:
+        logger.info(f"{unmatched} event(s) have an organizer that is not a club; left unlinked")
+
+@migration(6, 'change_log_backfill', checks=[
+    ("SELECT MAX(version) FROM change_log WHERE entity = 'club' AND entity_id = 1", 'ix_change_log_entity'),
+])
+def change_log_backfill(conn):
+    """Seed the change log (created by create_all) with every existing row, so since=0 is a full sync"""
+    if conn.execute(text("SELECT COUNT(*) FROM change_log")).scalar():
+        return
+    for entity, table in (('club', 'clubs'), ('member', 'club_members'), ('event', 'events')):
+        conn.execute(text(f"INSERT INTO change_log (entity, entity_id, op, changed_at) "
+                          f"SELECT '{entity}', id, 'upsert', :now FROM {table} ORDER BY id"),
+                     {'now': datetime.utcnow()})
+
+@migration(7, 'member_roster_keyset', checks=[
+    ("SELECT * FROM club_members WHERE club_id = 1 AND joined_at < '2025-11-01' "
+     "ORDER BY joined_at DESC, id DESC LIMIT 26", 'ix_club_members_club_joined_at_id'),
+])
+def member_roster_keyset(conn):
+    """Composite index for paging a club's roster by (joined_at, id)"""
+    create_index(conn, 'ix_club_members_club_joined_at_id', 'club_members', ['club_id', 'joined_at', 'id'])
+
+# ==================== RUNNER ====================
+
+def ensure_version_table(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations ("
+                      "version INTEGER PRIMARY KEY, "
+                      "name VARCHAR(200) NOT NULL, "
+                      "applied_at TIMESTAMP NOT NULL)"))
+
+def applied_versions(conn):
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def verify(db, migrations=None):
+    """Run EXPLAIN checks for ``migrations`` (default: all); returns False if any index is unused"""
+    ok = True
+    for m in migrations if migrations is not None else MIGRATIONS:
+        if not m['checks']:
+            continue
+        with db.engine.connect() as conn:
+            with conn.begin() as transaction:
+                results = run_checks(conn, m['checks'])
+                transaction.rollback()
+        for sql, index_name, passed, plan in results:
+            if passed is None:
+                logger.info(f"Migration {m['version']}: EXPLAIN not supported on this database, skipped")
+            elif passed:
+                logger.info(f"✓ Migration {m['version']}: {index_name} used by: {sql}")
+            else:
+                ok = False
+                logger.warning(f"✗ Migration {m['version']}: {index_name} NOT used by: {sql} -> {plan}")
+    return ok
+
+def upgrade(db):
+    """Create missing tables, then apply pending migrations in version order"""
+    db.create_all()
+    with db.engine.begin() as conn:
+        ensure_version_table(conn)
+        applied = applied_versions(conn)
+
+    pending = [m for m in MIGRATIONS if m['version'] not in applied]
+    for m in pending:
+        with db.engine.begin() as conn:
+            m['upgrade'](conn)
+            conn.execute(text("INSERT INTO schema_migrations (version, name, applied_at) "
+                              "VALUES (:version, :name, :applied_at)"),
+                         {'version': m['version'], 'name': m['name'], 'applied_at': datetime.utcnow()})
+        logger.info(f"✓ Applied migration {m['version']}: {m['name']}")
+
+    if pending:
+        verify(db, pending)
+    return [m['version'] for m in pending]
+
+def status(db):
+    """(version, name, applied) for every known migration"""
+    with db.engine.begin() as conn:
+        ensure_version_table(conn)
+        applied = applied_versions(conn)
+    return [(m['version'], m['name'], m['version'] in applied) for m in MIGRATIONS]
+
+if __name__ == '__main__':
+    from app import app, db
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    with app.app_context():
+        if command == 'upgrade':
+            applied = upgrade(db)
+            print(f"✓ Applied {len(applied)} migration(s)" if applied else "✓ Schema is up to date")
+        elif command == 'status':
+            for version, name, applied in status(db):
+                print(f"{'✓' if applied else ' '} {version:04d} {name}")
+        elif command == 'verify':
+            ok = verify(db)
+            print("✓ All indexes are used" if ok else "✗ Some hot queries do not use their index")
+            sys.exit(0 if ok else 1)
+        else:
+            print(f"Unknown command: {command} (expected upgrade, status or verify)")
+            sys.exit(2)
@@ -1,26 +1,60 @@
-from datetime import datetime
+import re
+from datetime import datetime, date
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
+from database import RoutingSession
 
-db = SQLAlchemy()
+# Bound to the app in app.py with db.init_app(app)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# "October 25, 2025", "November 12-14, 2025", "Dec 2 2025"
+_EVENT_DATE = re.compile(r'([A-Za-z]+)\.?\s+(\d{1,2})(?:\s*[-–]\s*\d{1,2})?,?\s+(\d{4})')
+_ISO_DATE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+
+def parse_event_date(text):
+    """Best-effort start date of a free-text event date, or None"""
+    if not text:
+        return None
+    match = _ISO_DATE.search(text)
+    if match:
+        try:
+            return date(*map(int, match.groups()))
+        except ValueError:
+            return None
+    match = _EVENT_DATE.search(text)
+    if not match:
+        return None
+    month, day, year = match.groups()
+    for month_name, month_format in ((month, '%B'), (month[:3], '%b')):
+        try:
+            return datetime.strptime(f'{month_name} {day} {year}', f'{month_format} %d %Y').date()
+        except ValueError:
+            continue
+    return None
 
 class Club(db.Model):
     __tablename__ = 'clubs'
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
-    logo_filename = db.Column(db.String(200), nullable=True)  # Changed from logo_url
+    logo_filename = db.Column(db.String(200), nullable=True)  # Changed from logo_url (migration 3)
     members_count = db.Column(db.Integer, default=0)
     description = db.Column(db.Text, nullable=True)
     is_recruiting = db.Column(db.Boolean, default=False)
     application_link = db.Column(db.String(300), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # New fields for gallery and why join section
-    why_join_reasons = db.Column(db.Text, nullable=True)  # JSON string of reasons
-    gallery_images = db.Column(db.Text, nullable=True)  # JSON string of image filenames
-    
     members = db.relationship('ClubMember', backref='club', lazy='dynamic', cascade='all, delete-orphan')
     
+    # Ordered child rows for the "Why Join?" list and the gallery
+    why_join_reasons = db.relationship('ClubWhyJoinReason', order_by='ClubWhyJoinReason.position',
+                                       cascade='all, delete-orphan')
+    gallery_images = db.relationship('ClubGalleryImage', order_by='ClubGalleryImage.position',
+                                     lazy='dynamic', cascade='all, delete-orphan')
+    
+    # Events this club organizes; deleting the club unlinks them (organizer text stays)
+    events = db.relationship('Event', back_populates='organizer_club', order_by='Event.starts_on')
+    
     def __repr__(self):
         return f'<Club {self.name}>'
     
@@ -34,36 +68,166 @@ class Club(db.Model):
             'description': self.description or 'No description available.',
             'is_recruiting': bool(self.is_recruiting),
             'application_link': self.application_link or '',
-            'why_join_reasons': self.why_join_reasons or '[]',
-            'gallery_images': self.gallery_images or '[]'
+            'why_join_reasons': [item.reason for item in self.why_join_reasons]
         }
 
+class ClubWhyJoinReason(db.Model):
+    __tablename__ = 'club_why_join_reasons'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    reason = db.Column(db.String(300), nullable=False)
+    
+    def __repr__(self):
+        return f'<ClubWhyJoinReason {self.club_id}#{self.position}>'
+
+class ClubGalleryImage(db.Model):
+    __tablename__ = 'club_gallery_images'
+    __table_args__ = (
+        db.Index('ix_club_gallery_images_club_position', 'club_id', 'position'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    filename = db.Column(db.String(200), nullable=False)
+    
+    def __repr__(self):
+        return f'<ClubGalleryImage {self.filename}>'
+
 class ClubMember(db.Model):
     __tablename__ = 'club_members'
+    __table_args__ = (
+        # Keyset pagination of a club's roster, newest first (migration 7)
+        db.Index('ix_club_members_club_joined_at_id', 'club_id', 'joined_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     role = db.Column(db.String(100), nullable=False)
-    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=False)
-    joined_at = db.Column(db.DateTime, default=datetime.utcnow)
+    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=False, index=True)
+    joined_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     def __repr__(self):
         return f'<ClubMember {self.name} - {self.role}>'
 
 class Event(db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        # Serves both the FK lookup and "upcoming events of club X" (migration 5)
+        db.Index('ix_events_organizer_club_starts_on', 'organizer_club_id', 'starts_on'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    category = db.Column(db.String(50), nullable=False)
+    category = db.Column(db.String(50), nullable=False, index=True)
     date = db.Column(db.String(50), nullable=False)
+    starts_on = db.Column(db.Date, nullable=True, index=True)  # parsed from date (migration 4)
     time = db.Column(db.String(50), nullable=False)
     location = db.Column(db.String(200), nullable=False)
-    organizer = db.Column(db.String(100), nullable=False)
+    organizer = db.Column(db.String(100), nullable=False, index=True)
+    organizer_club_id = db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=True)
     image_url = db.Column(db.String(200), nullable=True)
     size_class = db.Column(db.String(20), default='size-medium')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    organizer_club = db.relationship('Club', back_populates='events')
     
     def __repr__(self):
         return f'<Event {self.title}>'
+    
+    def to_dict(self):
+        """Compact dictionary for list payloads (description omitted)"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'category': self.category,
+            'date': self.date,
+            'starts_on': self.starts_on.isoformat() if self.starts_on else None,
+            'time': self.time,
+            'location': self.location,
+            'organizer': self.organizer,
+            'organizer_club_id': self.organizer_club_id,
+            'image_url': self.image_url or '',
+            'size_class': self.size_class or 'size-medium'
+        }
+    
+    @validates('date')
+    def update_starts_on(self, key, value):
+        """Keep the sortable/filterable starts_on in step with the free-text date"""
+        self.starts_on = parse_event_date(value)
+        return value
+
+class LiveUpdate(db.Model):
+    """A committed change announced to open pages (see live.py); pruned after a few minutes"""
+    __tablename__ = 'live_updates'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<LiveUpdate {self.id} {self.topic}>'
+
+class ChangeLogEntry(db.Model):
+    """One change to a club, member or event, appended in the changing transaction (see changes.py)"""
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        # Latest entry per row, for compaction and "what changed since"
+        db.Index('ix_change_log_entity', 'entity', 'entity_id', 'version'),
+        # AUTOINCREMENT: SQLite must never hand out a version again after compaction
+        {'sqlite_autoincrement': True},
+    )
+    
+    version = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)  # 'club', 'member' or 'event'
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # 'upsert' or 'delete'
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<ChangeLogEntry {self.version} {self.op} {self.entity}:{self.entity_id}>'
+
+class ChangeLogState(db.Model):
+    """Single row: versions up to ``compacted_through`` may have lost their tombstones"""
+    __tablename__ = 'change_log_state'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    compacted_through = db.Column(db.Integer, nullable=False, default=0)
+    compacted_at = db.Column(db.DateTime, nullable=True)
+
+class ChatTranscript(db.Model):
+    """One chatbot question and answer, written in batches by transcripts.py"""
+    __tablename__ = 'chat_transcripts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    exchange_id = db.Column(db.String(32), unique=True, nullable=False)  # referenced by feedback
+    session_id = db.Column(db.String(32), nullable=True, index=True)  # the chat_sid cookie value
+    question = db.Column(db.Text, nullable=False)
+    answer = db.Column(db.Text, nullable=False)
+    path = db.Column(db.String(20), nullable=False)  # 'model', 'shared', 'fallback' or 'unavailable'
+    latency_ms = db.Column(db.Integer, nullable=False)
+    prompt_tokens = db.Column(db.Integer, nullable=True)
+    completion_tokens = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<ChatTranscript {self.exchange_id} {self.path}>'
+
+class ChatFeedback(db.Model):
+    """A thumbs up (+1) or down (-1) on one chatbot answer"""
+    __tablename__ = 'chat_feedback'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # No foreign key: feedback can be queued before its transcript is written
+    exchange_id = db.Column(db.String(32), nullable=False, index=True)
+    session_id = db.Column(db.String(32), nullable=True)
+    rating = db.Column(db.SmallInteger, nullable=False)
+    comment = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<ChatFeedback {self.exchange_id} {self.rating:+d}>'
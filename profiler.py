@@ -0,0 +1,277 @@
+import os
+import re
+import sys
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request, session, has_request_context, template_rendered, before_render_template
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Background sampling rate across all in-flight requests; 0 turns it off
+SAMPLE_HZ = float(os.environ.get('PROFILE_SAMPLE_HZ', 2))
+# Stack sampling rate for the one request being profiled on demand
+CAPTURE_HZ = float(os.environ.get('PROFILE_CAPTURE_HZ', 500))
+# Requests slower than this log their span breakdown as a warning
+SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 1000))
+# Send Server-Timing on every response, not only on profiled ones
+SERVER_TIMING = os.environ.get('PROFILE_SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+# Captures kept on disk; older ones are deleted
+KEEP = int(os.environ.get('PROFILE_KEEP', 20))
+MAX_STACKS = 5000
+
+CAPTURE_NAME = re.compile(r'^[0-9a-f]{12}-[\w.-]+\.(prof|folded)$')
+
+_active_threads = set()
+_background = Counter()
+_background_lock = threading.Lock()
+_sampler = None
+_state = {'profile_dir': None}
+
+# ==================== SPANS ====================
+
+def add_span(name, seconds, inclusive=None):
+    """Add ``seconds`` of exclusive time to the request's ``name`` span"""
+    if has_request_context() and 'spans' in g:
+        total, count = g.spans.get(name, (0.0, 0))
+        g.spans[name] = (total + seconds, count + 1)
+        if g.open_spans:
+            # The enclosing span excludes this time from its own
+            g.open_spans[-1][2] += seconds if inclusive is None else inclusive
+
+def open_span(name):
+    if has_request_context() and 'spans' in g:
+        g.open_spans.append([name, time.perf_counter(), 0.0])
+
+def close_span(name):
+    """Record the innermost open ``name`` span, minus the time of spans nested in it"""
+    if not (has_request_context() and 'spans' in g):
+        return
+    while g.open_spans:
+        open_name, start, nested = g.open_spans.pop()
+        if open_name == name:
+            elapsed = time.perf_counter() - start
+            add_span(name, elapsed - nested, elapsed)
+            return
+
+@contextmanager
+def span(name):
+    """Time a block of the current request under ``name``"""
+    open_span(name)
+    try:
+        yield
+    finally:
+        close_span(name)
+
+def instrument_engine(engine):
+    """Count query time on ``engine`` towards the request's ``db`` span"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if starts:
+            add_span('db', time.perf_counter() - starts.pop())
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that counts serialization towards the ``json`` span"""
+
+    def dumps(self, obj, **kwargs):
+        with span('json'):
+            return super().dumps(obj, **kwargs)
+
+def _start_template_timer(sender, template, context, **extra):
+    open_span('template')
+
+def _stop_template_timer(sender, template, context, **extra):
+    close_span('template')
+
+def server_timing(spans, total):
+    """Server-Timing header value; spans are exclusive and ``app`` is the remainder"""
+    parts = [f'{name};dur={seconds * 1000:.1f};desc="{count}x"' for name, (seconds, count) in spans.items()]
+    accounted = sum(seconds for seconds, _ in spans.values())
+    parts.append(f'app;dur={max(total - accounted, 0) * 1000:.1f}')
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+# ==================== STACK SAMPLING ====================
+
+def fold_stack(frame):
+    """``module:function;module:function`` from the outermost frame down to ``frame``"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def _count(counter, stack):
+    if stack in counter or len(counter) < MAX_STACKS:
+        counter[stack] += 1
+    else:
+        counter['(other)'] += 1
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of ``thread_ids()`` every ``1 / hz`` seconds into ``counter``"""
+
+    def __init__(self, hz, thread_ids, counter, lock=None):
+        super().__init__(daemon=True, name='stack-sampler')
+        self.interval = 1.0 / hz
+        self.thread_ids = thread_ids
+        self.counter = counter
+        self.lock = lock or threading.Lock()
+        self.stopped = threading.Event()
+        self.samples = 0
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id in list(self.thread_ids()):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        _count(self.counter, fold_stack(frame))
+                        self.samples += 1
+
+    def stop(self):
+        self.stopped.set()
+
+def ensure_background_sampler():
+    """Start this process's background sampler (lazily, so it survives a forking server)"""
+    global _sampler
+    if SAMPLE_HZ > 0 and (_sampler is None or not _sampler.is_alive()):
+        _sampler = StackSampler(SAMPLE_HZ, lambda: _active_threads, _background, _background_lock)
+        _sampler.start()
+        logger.info(f"Background stack sampling at {SAMPLE_HZ} Hz")
+
+def folded_text(counter):
+    """Folded stacks ("stack count" per line) for flamegraph.pl, speedscope or inferno"""
+    return ''.join(f'{stack} {count}\n' for stack, count in counter.most_common())
+
+def background_folded(reset=False):
+    with _background_lock:
+        text = folded_text(_background)
+        if reset:
+            _background.clear()
+    return text
+
+# ==================== ON-DEMAND CAPTURE ====================
+
+def profile_requested():
+    """Managers can profile one request with ``X-Profile: 1`` or ``?_profile=1``"""
+    flag = request.headers.get('X-Profile') or request.args.get('_profile')
+    return flag in ('1', 'true', 'yes') and bool(session.get('manager_logged_in'))
+
+def _capture_name(capture_id, suffix):
+    endpoint = re.sub(r'[^\w.-]', '_', request.endpoint or 'unknown')
+    return f'{capture_id}-{endpoint}.{suffix}'
+
+def _save_capture(capture):
+    """Write the .prof and .folded files of a finished capture and prune old ones"""
+    directory = _state['profile_dir']
+    capture['sampler'].stop()
+    if capture['profile'] is not None:
+        capture['profile'].disable()
+        pstats.Stats(capture['profile']).dump_stats(os.path.join(directory, _capture_name(capture['id'], 'prof')))
+    with open(os.path.join(directory, _capture_name(capture['id'], 'folded')), 'w') as f:
+        f.write(folded_text(capture['stacks']))
+
+    captures = sorted((entry for entry in os.scandir(directory) if CAPTURE_NAME.match(entry.name)),
+                      key=lambda entry: entry.stat().st_mtime)
+    ids = list(dict.fromkeys(entry.name[:12] for entry in captures))
+    stale = set(ids[:max(len(ids) - KEEP, 0)])
+    for entry in captures:
+        if entry.name[:12] in stale:
+            os.remove(entry.path)
+
+def list_captures():
+    """Saved capture files, newest first"""
+    directory = _state['profile_dir']
+    if not directory or not os.path.isdir(directory):
+        return []
+    entries = [entry for entry in os.scandir(directory) if CAPTURE_NAME.match(entry.name)]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [{'name': entry.name, 'bytes': entry.stat().st_size,
+             'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(entry.stat().st_mtime))}
+            for entry in entries]
+
+def profiler_stats():
+    return {
+        'background_hz': SAMPLE_HZ,
+        'background_samples': _sampler.samples if _sampler else 0,
+        'background_stacks': len(_background),
+        'captures': len(list_captures()),
+    }
+
+# ==================== WIRING ====================
+
+def init_profiling(app, profile_dir):
+    """Register span timing, background sampling and on-demand capture hooks"""
+    _state['profile_dir'] = profile_dir
+    os.makedirs(profile_dir, exist_ok=True)
+    app.json = TimedJSONProvider(app)
+    before_render_template.connect(_start_template_timer, app)
+    template_rendered.connect(_stop_template_timer, app)
+
+    @app.before_request
+    def start_request_profiling():
+        g.request_started = time.perf_counter()
+        g.spans = {}
+        g.open_spans = []
+        _active_threads.add(threading.get_ident())
+        ensure_background_sampler()
+
+        if profile_requested():
+            capture = {'id': uuid.uuid4().hex[:12], 'stacks': Counter(), 'profile': cProfile.Profile()}
+            thread_id = threading.get_ident()
+            capture['sampler'] = StackSampler(CAPTURE_HZ, lambda: (thread_id,), capture['stacks'])
+            capture['sampler'].start()
+            try:
+                capture['profile'].enable()
+            except ValueError:
+                # Another profiler is already active in this process
+                capture['profile'] = None
+            g.profile_capture = capture
+
+    @app.after_request
+    def report_request_timing(response):
+        if 'request_started' not in g:
+            return response
+        total = time.perf_counter() - g.request_started
+        capture = g.pop('profile_capture', None)
+        if capture is not None:
+            try:
+                _save_capture(capture)
+                response.headers['X-Profile-Id'] = capture['id']
+            except Exception as e:
+                logger.error(f"Failed to save profile capture: {str(e)}", exc_info=True)
+        # Not keyed on the manager session: reading it would add Vary: Cookie
+        # to every response, including the immutable image responses
+        if capture is not None or SERVER_TIMING:
+            response.headers['Server-Timing'] = server_timing(g.spans, total)
+        if total * 1000 >= SLOW_MS:
+            logger.warning(f"Slow request {request.method} {request.path}: {total * 1000:.0f} ms",
+                           extra={'duration_ms': round(total * 1000, 1),
+                                  'spans_ms': {name: round(seconds * 1000, 1)
+                                               for name, (seconds, _) in g.spans.items()}})
+        return response
+
+    @app.teardown_request
+    def finish_request_profiling(exc):
+        _active_threads.discard(threading.get_ident())
+        capture = g.pop('profile_capture', None)
+        if capture is not None:
+            # The view raised before after_request ran; still stop the profilers
+            capture['sampler'].stop()
+            if capture['profile'] is not None:
+                capture['profile'].disable()
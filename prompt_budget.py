@@ -0,0 +1,176 @@
+import math
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Approximate chat-template overhead per message ([INST] markers, role tags)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+class TokenCounter:
+    """Counts tokens with the model's own tokenizer, or estimates when it is unavailable.
+
+    The tokenizer is fetched from the Hub (and cached on disk) in the
+    background on first use, not at import: the first count waits for it
+    at most ``load_timeout`` seconds, and counts are estimated until it
+    arrives or if it cannot be loaded.
+    """
+
+    def __init__(self, model_name, hf_token=None, load_timeout=5.0):
+        self.model_name = model_name
+        self.hf_token = hf_token
+        self.load_timeout = load_timeout
+        self.tokenizer = None
+        self.loader = None
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            from tokenizers import Tokenizer
+            from huggingface_hub import hf_hub_download
+            path = hf_hub_download(self.model_name, 'tokenizer.json', token=self.hf_token,
+                                   etag_timeout=self.load_timeout)
+            self.tokenizer = Tokenizer.from_file(path)
+            logger.info(f"✓ Loaded tokenizer for {self.model_name}")
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable ({e}); estimating token counts")
+
+    def _get_tokenizer(self):
+        if self.loader is None:
+            with self.lock:
+                started = self.loader is None
+                if started:
+                    self.loader = threading.Thread(target=self._load, daemon=True, name='tokenizer-load')
+                    self.loader.start()
+            if started:
+                # Only the first caller waits, and only this once
+                self.loader.join(self.load_timeout)
+        return self.tokenizer
+
+    @property
+    def mode(self):
+        return 'exact' if self.tokenizer else 'estimate'
+
+    def count(self, text):
+        """Number of tokens in ``text``"""
+        if not text:
+            return 0
+        tokenizer = self._get_tokenizer()
+        if tokenizer:
+            return len(tokenizer.encode(text, add_special_tokens=False).ids)
+        # Llama/Mistral style tokenizers average ~3.5 UTF-8 bytes per token on
+        # English text; rounding up keeps the estimate on the safe side
+        return math.ceil(len(text.encode('utf-8')) / 3.5)
+
+    def count_message(self, message):
+        return self.count(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+    def truncate(self, text, max_tokens):
+        """Cut ``text`` so that it fits in ``max_tokens``"""
+        if self.count(text) <= max_tokens:
+            return text
+        tokenizer = self._get_tokenizer()
+        if tokenizer:
+            encoding = tokenizer.encode(text, add_special_tokens=False)
+            end = encoding.offsets[max_tokens - 1][1] if max_tokens > 0 else 0
+            return text[:end]
+        return text.encode('utf-8')[:int(max_tokens * 3.5)].decode('utf-8', 'ignore')
+
+def summarize_exchange(user_text, assistant_text):
+    """One-line extractive summary of a user/assistant exchange"""
+    question = ' '.join(user_text.split())[:120]
+    # Leading sentences of the answer, enough to carry its gist
+    gist = ''
+    for sentence in re.split(r'(?<=[.!?])\s+', ' '.join(assistant_text.split())):
+        gist = f"{gist} {sentence}".strip()
+        if len(gist) >= 60:
+            break
+    return f"- Student asked: {question} | You answered: {gist[:160]}"
+
+class PromptAssembler:
+    """Builds chat messages that fit an explicit token budget.
+
+    The system prompt and the new user message are always included. Recent
+    history is added newest-first while it fits; older exchanges are folded
+    into a short running summary appended to the system prompt instead of
+    being dropped.
+    """
+
+    def __init__(self, counter, budget, reply_tokens, summary_tokens=300):
+        self.counter = counter
+        self.budget = budget
+        self.reply_tokens = reply_tokens
+        self.summary_tokens = summary_tokens
+
+    def compact_summary(self, summary_lines):
+        """Drop the oldest summary lines until the summary fits its budget"""
+        lines = list(summary_lines)
+        while lines and self.counter.count('\n'.join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        return lines
+
+    def assemble(self, system_prompt, history, summary_lines, user_message):
+        """Return ``(messages, kept_history, summary_lines, usage)``.
+
+        ``history`` is a list of alternating user/assistant messages;
+        ``kept_history`` is the suffix that made it into the prompt and
+        ``summary_lines`` now also covers every exchange that did not.
+        """
+        available = self.budget - self.reply_tokens
+
+        user_tokens = self.counter.count(user_message) + MESSAGE_OVERHEAD_TOKENS
+        # The system prompt may use at most what is left after the user message
+        # and the summary, so a huge catalog cannot crowd out the question
+        system_cap = max(available - user_tokens - self.summary_tokens, 0)
+        if self.counter.count(system_prompt) > system_cap:
+            logger.warning(f"System prompt truncated to {system_cap} tokens")
+            system_prompt = self.counter.truncate(system_prompt, system_cap)
+        system_tokens = self.counter.count(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+
+        # History gets what is left after reserving the full summary budget, so
+        # folding dropped exchanges into the summary can never overflow
+        summary_lines = self.compact_summary(summary_lines)
+        remaining = available - system_tokens - user_tokens - self.summary_tokens
+
+        # Whole exchanges only, newest first
+        exchanges = [history[i:i + 2] for i in range(0, len(history) - 1, 2)]
+        kept = []
+        history_tokens = 0
+        for exchange in reversed(exchanges):
+            cost = sum(self.counter.count_message(message) for message in exchange)
+            if cost > remaining - history_tokens:
+                break
+            kept.insert(0, exchange)
+            history_tokens += cost
+
+        dropped = exchanges[:len(exchanges) - len(kept)]
+        if dropped:
+            summary_lines = self.compact_summary(
+                summary_lines + [summarize_exchange(user['content'], assistant['content'])
+                                 for user, assistant in dropped]
+            )
+        summary_tokens = self.counter.count('\n'.join(summary_lines))
+
+        content = system_prompt
+        if summary_lines:
+            content += "\n\nEARLIER IN THIS CONVERSATION:\n" + '\n'.join(summary_lines)
+
+        messages = [{"role": "system", "content": content}]
+        for exchange in kept:
+            messages.extend(exchange)
+        messages.append({"role": "user", "content": user_message})
+
+        kept_history = [message for exchange in kept for message in exchange]
+        usage = {
+            'prompt_tokens': system_tokens + summary_tokens + history_tokens + user_tokens,
+            'system_tokens': system_tokens,
+            'summary_tokens': summary_tokens,
+            'history_tokens': history_tokens,
+            'user_tokens': user_tokens,
+            'history_turns': len(kept),
+            'compacted_turns': len(dropped),
+            'budget': self.budget,
+            'tokenizer': self.counter.mode,
+        }
+        return messages, kept_history, summary_lines, usage
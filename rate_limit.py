@@ -0,0 +1,187 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from functools import wraps
+from flask import jsonify, make_response
+
+logger = logging.getLogger(__name__)
+
+# ==================== BUCKET STORES ====================
+
+def refill(tokens, updated, capacity, rate, now):
+    """Tokens in a bucket after refilling at ``rate`` per second since ``updated``"""
+    return min(capacity, tokens + max(now - updated, 0) * rate)
+
+class MemoryBucketStore:
+    """Per-process buckets; only suitable for a single worker or local development"""
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, limits, now=None):
+        """Atomically take one token from every bucket in ``limits``.
+
+        ``limits`` is a list of ``(key, capacity, rate)``. Returns the number
+        of seconds to wait, or 0 when the tokens were taken.
+        """
+        now = now or time.time()
+        with self.lock:
+            levels = [refill(*self.buckets.get(key, (capacity, now)), capacity, rate, now)
+                      for key, capacity, rate in limits]
+            wait = max([(1 - level) / rate for level, (_, _, rate) in zip(levels, limits) if level < 1] or [0])
+            if wait == 0:
+                for level, (key, _, _) in zip(levels, limits):
+                    self.buckets[key] = (level - 1, now)
+            return wait
+
+class SQLiteBucketStore:
+    """Buckets in a small SQLite file shared by every worker on the host.
+
+    Each check is one short BEGIN IMMEDIATE transaction, so concurrent
+    workers serialize on the file lock instead of racing on the counters.
+    """
+
+    CLEANUP_EVERY = 500
+    IDLE_SECONDS = 3600
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.calls = 0
+        conn = self._connect()
+        conn.execute('CREATE TABLE IF NOT EXISTS buckets ('
+                     'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def take(self, limits, now=None):
+        """Atomically take one token from every bucket in ``limits``; see MemoryBucketStore.take"""
+        now = now or time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            levels = []
+            for key, capacity, rate in limits:
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                levels.append(refill(tokens, updated, capacity, rate, now))
+            wait = max([(1 - level) / rate for level, (_, _, rate) in zip(levels, limits) if level < 1] or [0])
+            if wait == 0:
+                conn.executemany('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                                 [(key, level - 1, now) for level, (key, _, _) in zip(levels, limits)])
+            self.calls += 1
+            if self.calls % self.CLEANUP_EVERY == 0:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - self.IDLE_SECONDS,))
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+# ==================== LIMITER ====================
+
+class TokenBucketLimiter:
+    """Token-bucket limits keyed by session and client IP.
+
+    ``rules`` maps a scope name to ``(burst, per_minute)``; every request
+    must find a token in the bucket of each scope it has a key for.
+    """
+
+    def __init__(self, store, rules):
+        self.store = store
+        self.rules = {scope: (burst, per_minute / 60.0) for scope, (burst, per_minute) in rules.items()}
+        self.rejected = 0
+
+    def check(self, name, keys):
+        """Return seconds to wait (0 means allowed) for ``keys`` = {scope: key}"""
+        limits = [(f'{name}:{scope}:{key}', *self.rules[scope])
+                  for scope, key in keys.items() if key and scope in self.rules]
+        if not limits:
+            return 0
+        try:
+            wait = self.store.take(limits)
+        except Exception as e:
+            # Fail open: a broken limiter must not take the chatbot down
+            logger.error(f"Rate limiter store error: {e}")
+            return 0
+        if wait:
+            self.rejected += 1
+        return wait
+
+    def limit(self, name, key_func):
+        """Decorator that answers 429 with Retry-After before the view does any work"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                wait = self.check(name, key_func())
+                if wait:
+                    response = make_response(jsonify({
+                        'error': 'Too many requests',
+                        'response': "You're sending messages too quickly. Please wait a moment! ⏳",
+                        'retry_after': round(wait, 1)
+                    }), 429)
+                    response.headers['Retry-After'] = str(max(int(wait + 0.999), 1))
+                    return response
+                return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+# ==================== SINGLE-FLIGHT ====================
+
+class SingleFlight:
+    """Coalesce identical in-flight calls so concurrent callers share one result"""
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Run ``fn`` once per ``key`` at a time; followers wait for the leader's result"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self.calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call['done'].wait(self.timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight call {key!r}")
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call['done'].set()
+
+def create_store(path=None):
+    """Shared SQLite store when possible, in-process memory otherwise"""
+    try:
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return SQLiteBucketStore(path)
+    except Exception as e:
+        logger.error(f"Falling back to in-process rate limits: {e}")
+    return MemoryBucketStore()
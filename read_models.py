@@ -0,0 +1,235 @@
+"""Immutable rows for the read-only views.
+
+Listing pages and the chatbot only read a few columns of many rows, so
+instead of ORM entities (tracked in the identity map, every column
+loaded) they query just the columns their read model declares and get
+frozen, slotted dataclasses back:
+
+    clubs = ClubCard.all(ClubCard.query().order_by(Club.id))
+
+A read model's fields are the columns its view needs; ``expressions``
+maps a field to anything other than the model column of the same name.
+The templates shared with the manager routes accept either kind of row.
+
+    python read_models.py bench [rows]    # ORM entities vs read models, time and memory
+"""
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, fields
+from datetime import datetime
+from sqlalchemy import func
+from models import db, Club, ClubMember, Event
+
+class ReadModel:
+    __slots__ = ()
+
+    model = None
+    expressions = {}
+
+    @classmethod
+    def columns(cls):
+        return [cls.expressions.get(field.name, getattr(cls.model, field.name)).label(field.name)
+                for field in fields(cls)]
+
+    @classmethod
+    def query(cls):
+        """Query of this read model's columns; filter and order it like a model query"""
+        return db.session.query(*cls.columns())
+
+    @classmethod
+    def all(cls, query):
+        return [cls(*row) for row in query]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+# ==================== CLUBS ====================
+
+@dataclass(frozen=True, slots=True)
+class ClubCard(ReadModel):
+    """A club on the clubs page and in /api/clubs"""
+    id: int
+    name: str
+    logo_filename: str | None
+    members_count: int | None
+    description: str | None
+    is_recruiting: bool | None
+
+    model = Club
+
+@dataclass(frozen=True, slots=True)
+class DashboardClub(ReadModel):
+    """A club row of the manager dashboard, which shows 50 characters of the description"""
+    id: int
+    name: str
+    description: str | None
+    members_count: int | None
+    is_recruiting: bool | None
+
+    model = Club
+    expressions = {'description': func.substr(Club.description, 1, 50)}
+
+@dataclass(frozen=True, slots=True)
+class ChatbotClub(ReadModel):
+    """A club in the chatbot's database context"""
+    name: str
+    description: str | None
+    members_count: int | None
+    is_recruiting: bool | None
+    application_link: str | None
+
+    model = Club
+
+# ==================== EVENTS ====================
+
+@dataclass(frozen=True, slots=True)
+class EventCard(ReadModel):
+    """An event brick on the events page; the description feeds its detail modal"""
+    id: int
+    title: str
+    description: str
+    category: str
+    date: str
+    time: str
+    location: str
+    organizer: str
+    image_url: str | None
+    size_class: str | None
+
+    model = Event
+
+@dataclass(frozen=True, slots=True)
+class EventSummary(ReadModel):
+    """An event in /api/events: Event.to_dict() without loading the description"""
+    id: int
+    title: str
+    category: str
+    date: str
+    starts_on: object
+    time: str
+    location: str
+    organizer: str
+    organizer_club_id: int | None
+    image_url: str | None
+    size_class: str | None
+
+    model = Event
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'category': self.category,
+            'date': self.date,
+            'starts_on': self.starts_on.isoformat() if self.starts_on else None,
+            'time': self.time,
+            'location': self.location,
+            'organizer': self.organizer,
+            'organizer_club_id': self.organizer_club_id,
+            'image_url': self.image_url or '',
+            'size_class': self.size_class or 'size-medium'
+        }
+
+@dataclass(frozen=True, slots=True)
+class DashboardEvent(ReadModel):
+    """An event row of the manager dashboard, which shows 40 characters of the description"""
+    id: int
+    title: str
+    description: str
+    category: str
+    date: str
+    organizer: str
+    size_class: str | None
+
+    model = Event
+    expressions = {'description': func.substr(Event.description, 1, 40)}
+
+@dataclass(frozen=True, slots=True)
+class ChatbotEvent(ReadModel):
+    """An event in the chatbot's database context"""
+    title: str
+    description: str
+    category: str
+    date: str
+    time: str
+    location: str
+    organizer: str
+
+    model = Event
+
+# ==================== MEMBERS ====================
+
+@dataclass(frozen=True, slots=True)
+class MemberCard(ReadModel):
+    """A member on the roster pages and in their JSON"""
+    id: int
+    club_id: int
+    name: str
+    role: str
+    joined_at: datetime | None
+
+    model = ClubMember
+
+# ==================== BENCHMARK ====================
+
+def _measure(load, repeat):
+    """Mean milliseconds per call and peak KiB allocated by one call"""
+    load()
+    db.session.expunge_all()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        load()
+        db.session.expunge_all()
+    elapsed = (time.perf_counter() - started) * 1000 / repeat
+    tracemalloc.start()
+    load()
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return elapsed, peak
+
+def bench(rows, repeat=20):
+    """Time and peak memory of each listing read as ORM entities and as read models,
+    against a scratch in-memory database of ``rows`` clubs and events"""
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    description = 'Workshops, talks and weekend projects for every level. ' * 8
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Club.__table__.insert(), [
+            {'name': f'Club {i}', 'description': description, 'members_count': i % 90,
+             'is_recruiting': i % 3 == 0, 'application_link': 'https://example.com/apply'}
+            for i in range(rows)])
+        db.session.execute(Event.__table__.insert(), [
+            {'title': f'Event {i}', 'description': description, 'category': 'Technical',
+             'date': 'October 25, 2025', 'time': '5:00 PM', 'location': 'Main Auditorium',
+             'organizer': f'Club {i % rows}', 'image_url': '/static/images/event.jpg'}
+            for i in range(rows)])
+        db.session.commit()
+
+        cases = [
+            ('clubs page', lambda: Club.query.all(), lambda: ClubCard.all(ClubCard.query())),
+            ('events page', lambda: Event.query.all(), lambda: EventCard.all(EventCard.query())),
+            ('events API', lambda: [event.to_dict() for event in Event.query.all()],
+             lambda: [event.to_dict() for event in EventSummary.all(EventSummary.query())]),
+            ('dashboard', lambda: (Club.query.all(), Event.query.all()),
+             lambda: (DashboardClub.all(DashboardClub.query()), DashboardEvent.all(DashboardEvent.query()))),
+            ('chatbot context', lambda: (Club.query.all(), Event.query.all()),
+             lambda: (ChatbotClub.all(ChatbotClub.query()), ChatbotEvent.all(ChatbotEvent.query()))),
+        ]
+        print(f"{rows} clubs and {rows} events, mean of {repeat} runs")
+        print(f"{'view':<16} {'ORM ms':>8} {'rows ms':>8} {'ORM KiB':>9} {'rows KiB':>9}")
+        for name, entities, read_models in cases:
+            entity_ms, entity_kib = _measure(entities, repeat)
+            row_ms, row_kib = _measure(read_models, repeat)
+            print(f"{name:<16} {entity_ms:>8.2f} {row_ms:>8.2f} {entity_kib:>9.0f} {row_kib:>9.0f}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        bench(int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
+    else:
+        print("Usage: python read_models.py bench [rows]")
@@ -16,6 +16,13 @@
     // State
     let isOpen = false;
     let isTyping = false;
+    let defaultSuggestions = [];
+    let autocompleteTimer = null;
+    let autocompleteSeq = 0;
+    let completions = null;
+    
+    const AUTOCOMPLETE_DELAY_MS = 80;
+    const WORD = /[\p{L}\p{N}_]+/gu;
     
     // Initialize
     function init() {
@@ -31,6 +38,8 @@
         chatbotClear.addEventListener('click', clearConversation);
         chatSendBtn.addEventListener('click', sendMessage);
         chatInputField.addEventListener('keypress', handleKeyPress);
+        chatInputField.addEventListener('input', scheduleAutocomplete);
+        chatInputField.addEventListener('keydown', acceptFirstCompletion);
         
         // Close on escape
         document.addEventListener('keydown', (e) => {
@@ -75,6 +84,7 @@
             const data = await response.json();
             
             if (data.suggestions && data.suggestions.length > 0) {
+                defaultSuggestions = data.suggestions;
                 displaySuggestions(data.suggestions);
             }
         } catch (error) {
@@ -82,8 +92,75 @@
         }
     }
     
+    // Type-ahead: known club, event and organizer names for the end of the input
+    function scheduleAutocomplete() {
+        clearTimeout(autocompleteTimer);
+        autocompleteTimer = setTimeout(loadCompletions, AUTOCOMPLETE_DELAY_MS);
+    }
+    
+    async function loadCompletions() {
+        const text = chatInputField.value;
+        const seq = ++autocompleteSeq;
+        if (!text.trim()) {
+            showDefaultSuggestions();
+            return;
+        }
+        try {
+            const response = await fetch(`/api/autocomplete?q=${encodeURIComponent(text)}&limit=6`);
+            const data = await response.json();
+            // Ignore answers that arrive after a newer keystroke
+            if (seq !== autocompleteSeq) return;
+            if (data.suggestions && data.suggestions.length > 0) {
+                displayCompletions(data);
+            } else {
+                showDefaultSuggestions();
+            }
+        } catch (error) {
+            console.error('Error loading completions:', error);
+        }
+    }
+    
+    function displayCompletions(data) {
+        completions = data;
+        quickSuggestions.innerHTML = '';
+        
+        data.suggestions.forEach(suggestion => {
+            const chip = document.createElement('button');
+            chip.className = `suggestion-chip autocomplete-chip ${suggestion.kind}`;
+            chip.textContent = suggestion.label;
+            chip.addEventListener('click', () => applyCompletion(suggestion.label));
+            quickSuggestions.appendChild(chip);
+        });
+    }
+    
+    function showDefaultSuggestions() {
+        if (completions) {
+            completions = null;
+            displaySuggestions(defaultSuggestions);
+        }
+    }
+    
+    // Replace the words the completion was matched against with the full name
+    function applyCompletion(label) {
+        const text = chatInputField.value;
+        const words = [...text.matchAll(WORD)];
+        const first = words[words.length - completions.words];
+        const start = first ? first.index : text.length;
+        chatInputField.value = text.slice(0, start) + label + ' ';
+        chatInputField.focus();
+        showDefaultSuggestions();
+    }
+    
+    function acceptFirstCompletion(e) {
+        if (e.key === 'Tab' && completions && chatInputField.value.trim()) {
+            e.preventDefault();
+            applyCompletion(completions.suggestions[0].label);
+        }
+    }
+    
     // Display suggestions
     function displaySuggestions(suggestions) {
+        completions = null;
         quickSuggestions.innerHTML = '';
         
         suggestions.forEach(suggestion => {
@@ -114,6 +191,8 @@
         
         // Clear input
         chatInputField.value = '';
+        autocompleteSeq++;
+        showDefaultSuggestions();
         
         // Remove welcome message if exists
         const welcomeMsg = chatbotMessages.querySelector('.welcome-message');
@@ -144,7 +223,7 @@
             
             if (response.ok) {
                 // Add bot response
-                addMessage(data.response, 'bot');
+                addMessage(data.response, 'bot', data.exchange_id);
                 
                 // Update suggestions if provided
                 if (data.suggestions && data.suggestions.length > 0) {
@@ -161,8 +240,8 @@
         }
     }
     
-    // Add message to chat
-    function addMessage(text, sender) {
+    // Add message to chat; answers with an exchange id can be rated
+    function addMessage(text, sender, exchangeId) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${sender}`;
         
@@ -178,12 +257,61 @@
             </div>
         `;
         
+        if (exchangeId) {
+            messageDiv.querySelector('.message-content-wrapper').appendChild(createFeedbackButtons(exchangeId));
+        }
+        
         chatbotMessages.appendChild(messageDiv);
         
         // Scroll to bottom
         scrollToBottom();
     }
     
+    // Thumbs up/down under a bot answer
+    function createFeedbackButtons(exchangeId) {
+        const wrapper = document.createElement('div');
+        wrapper.className = 'message-feedback';
+        
+        [[1, '👍', 'Helpful'], [-1, '👎', 'Not helpful']].forEach(([rating, icon, label]) => {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'feedback-btn';
+            button.textContent = icon;
+            button.title = label;
+            button.setAttribute('aria-label', label);
+            button.addEventListener('click', () => sendFeedback(exchangeId, rating, wrapper, button));
+            wrapper.appendChild(button);
+        });
+        
+        return wrapper;
+    }
+    
+    async function sendFeedback(exchangeId, rating, wrapper, button) {
+        const buttons = wrapper.querySelectorAll('.feedback-btn');
+        buttons.forEach(btn => {
+            btn.disabled = true;
+            btn.classList.toggle('selected', btn === button);
+        });
+        
+        try {
+            const response = await fetch('/api/chatbot/feedback', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ exchange_id: exchangeId, rating: rating })
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        } catch (error) {
+            console.error('Error sending feedback:', error);
+            // Let the user try again
+            buttons.forEach(btn => {
+                btn.disabled = false;
+                btn.classList.remove('selected');
+            });
+        }
+    }
+    
     // Show typing indicator
     function showTypingIndicator() {
         isTyping = true;
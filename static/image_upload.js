@@ -0,0 +1,75 @@
+// ===== MANAGER IMAGE UPLOADS =====
+
+(function() {
+    'use strict';
+
+    const POLL_INTERVAL_MS = 1000;
+
+    function setStatus(widget, text) {
+        widget.querySelector('.upload-status').textContent = text;
+    }
+
+    // Rebuild the picker's datalist so images uploaded elsewhere show up too
+    async function refreshImageList(widget) {
+        const datalist = document.getElementById(widget.dataset.datalist);
+        if (!datalist) return;
+        try {
+            const response = await fetch(widget.dataset.listUrl);
+            if (!response.ok) return;
+            const data = await response.json();
+            datalist.innerHTML = '';
+            data.images.forEach(image => {
+                const option = document.createElement('option');
+                option.value = widget.dataset.value === 'url' ? image.url : image.filename;
+                datalist.appendChild(option);
+            });
+        } catch (error) {
+            console.error('Error loading images:', error);
+        }
+    }
+
+    async function waitUntilReady(upload) {
+        while (upload.status === 'processing') {
+            await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+            const response = await fetch(upload.status_url);
+            upload = await response.json();
+            if (!response.ok) throw new Error(upload.error || 'Upload failed');
+        }
+        if (upload.status !== 'ready') throw new Error(upload.error || 'Upload failed');
+        return upload;
+    }
+
+    async function uploadFile(widget, file) {
+        const target = document.getElementById(widget.dataset.target);
+        setStatus(widget, `Uploading ${file.name}...`);
+        try {
+            // Raw body, not multipart: the server streams it straight to disk
+            const response = await fetch(widget.dataset.uploadUrl, {
+                method: 'POST',
+                headers: { 'Content-Type': file.type || 'application/octet-stream' },
+                body: file
+            });
+            let upload = await response.json();
+            if (!response.ok) throw new Error(upload.error || 'Upload failed');
+
+            setStatus(widget, 'Processing image...');
+            upload = await waitUntilReady(upload);
+
+            target.value = widget.dataset.value === 'url' ? upload.url : upload.filename;
+            setStatus(widget, upload.deduplicated ? 'Already uploaded, selected it.' : 'Image ready and selected.');
+            refreshImageList(widget);
+        } catch (error) {
+            setStatus(widget, error.message);
+        }
+    }
+
+    document.querySelectorAll('[data-image-upload]').forEach(widget => {
+        const input = widget.querySelector('input[type="file"]');
+        input.addEventListener('change', () => {
+            if (input.files.length) uploadFile(widget, input.files[0]);
+            input.value = '';
+        });
+        const target = document.getElementById(widget.dataset.target);
+        if (target) target.addEventListener('focus', () => refreshImageList(widget));
+    });
+})();
@@ -0,0 +1,51 @@
+// ===== LIVE CATALOG UPDATES =====
+// subscribeLive(['events'], {'event.created': fn, ...}) patches the page as
+// managers save changes; `url` points it at another stream (the dashboard
+// listens on /manager/live). EventSource reconnects on its own and resumes from
+// the last event id, so no reload is needed after a dropped connection.
+
+(function() {
+    'use strict';
+
+    window.subscribeLive = function(topics, handlers, url) {
+        if (!window.EventSource) return null;
+
+        const source = new EventSource((url || '/api/live') + '?topics=' + encodeURIComponent(topics.join(',')));
+
+        topics.forEach(topic => {
+            source.addEventListener(topic, message => {
+                const update = JSON.parse(message.data);
+                const handler = handlers[update.type];
+                if (handler) {
+                    try {
+                        handler(update);
+                    } catch (error) {
+                        console.error('Error applying live update:', error);
+                    }
+                }
+            });
+        });
+
+        // The server could not replay what we missed: fall back to one reload
+        source.addEventListener('reset', () => {
+            source.close();
+            window.location.reload();
+        });
+
+        return source;
+    };
+
+    // Replace the element matching `selector` with `html`, or insert it via `insert`
+    window.patchElement = function(selector, html, insert) {
+        const template = document.createElement('template');
+        template.innerHTML = html.trim();
+        const element = template.content.firstElementChild;
+        const existing = document.querySelector(selector);
+        if (existing) {
+            existing.replaceWith(element);
+        } else if (insert) {
+            insert(element);
+        }
+        return element;
+    };
+})();
@@ -0,0 +1,214 @@
+"""Static export of the public pages for the front proxy.
+
+With STATIC_EXPORT_DIR set, every committed manager change re-renders the
+pages it affects (HTML plus JSON, each with a precompressed .gz and, when
+the optional ``brotli`` package is installed, .br variant). A full export
+runs from the command line, e.g. at deploy time and once a day so the
+"upcoming events" lists roll over:
+
+    python static_export.py                  # every page
+    python static_export.py events club:3    # selected pages
+
+The front proxy serves the directory and forwards only what is not there
+(manager, chatbot, login, filtered queries) to Flask, e.g. for nginx:
+
+    map $arg_page $gallery_page { "" 1; default $arg_page; }   # http block
+
+    root /srv/clubs/public;
+    gzip_static on;
+    location ~ ^/club/(\\d+)$               { try_files /club/$1.html @flask; }
+    location ~ ^/api/club/(\\d+)/gallery$   { try_files /api/club/$1/gallery/$gallery_page.json @flask; }
+    location ~ ^/(home|about|clubs|events)$ { if ($args) { return 418; } error_page 418 = @flask;
+                                              try_files /$1.html @flask; }
+    location ~ ^/api/(events|clubs|club/\\d+)$ { if ($args) { return 418; } error_page 418 = @flask;
+                                                 try_files /api/$1.json @flask; }
+    location / { try_files $uri @flask; }
+"""
+import os
+import sys
+import gzip
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event, inspect
+from database import PRIMARY_ONLY_ENVIRON
+from models import Club, ClubMember, ClubWhyJoinReason, ClubGalleryImage, Event
+
+logger = logging.getLogger(__name__)
+
+try:
+    # Optional dependency: `pip install brotli`
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_PAGES = ('home', 'about', 'clubs', 'events')
+
+def pages_for_change(obj, deleted=False):
+    """Page keys whose output depends on a flushed ``obj``"""
+    if isinstance(obj, Club):
+        pages = {f'club:{obj.id}', 'clubs'}
+        # Club names are organizer labels and facets on the events page
+        if deleted or inspect(obj).attrs.name.history.has_changes():
+            pages.add('events')
+        return pages
+    if isinstance(obj, (ClubMember, ClubWhyJoinReason, ClubGalleryImage)):
+        return {f'club:{obj.club_id}'} if obj.club_id else set()
+    if isinstance(obj, Event):
+        history = inspect(obj).attrs.organizer_club_id.history
+        club_ids = {club_id for club_id in history.sum() if club_id}
+        return {'events'} | {f'club:{club_id}' for club_id in club_ids}
+    return set()
+
+class StaticExporter:
+    """Renders public pages through the app itself and writes them to ``directory``"""
+
+    def __init__(self, app, directory, gallery_page_size):
+        self.app = app
+        self.directory = os.path.abspath(directory)
+        self.gallery_page_size = gallery_page_size
+        self.lock = threading.Lock()
+        self.pending = set()
+        # One worker: exports run in commit order and never overlap
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='static-export')
+
+    # ==================== RENDERING ====================
+
+    def targets(self, page):
+        """``(url, output path)`` pairs rendered for a page key"""
+        if page in ('home', 'about'):
+            return [(f'/{page}', f'{page}.html')]
+        if page in ('clubs', 'events'):
+            return [(f'/{page}', f'{page}.html'), (f'/api/{page}', f'api/{page}.json')]
+        if page.startswith('club:'):
+            club_id = int(page.split(':', 1)[1])
+            targets = [(f'/club/{club_id}', f'club/{club_id}.html'),
+                       (f'/api/club/{club_id}', f'api/club/{club_id}.json')]
+            image_count = ClubGalleryImage.query.filter_by(club_id=club_id).count()
+            pages = max((image_count + self.gallery_page_size - 1) // self.gallery_page_size, 1)
+            targets.extend((f'/api/club/{club_id}/gallery?page={n}', f'api/club/{club_id}/gallery/{n}.json')
+                           for n in range(1, pages + 1))
+            return targets
+        raise ValueError(f"Unknown page: {page}")
+
+    def write(self, relative_path, body):
+        """Write ``body`` and its compressed variants; returns False when nothing changed"""
+        path = os.path.join(self.directory, relative_path)
+        try:
+            with open(path, 'rb') as f:
+                if f.read() == body:
+                    return False
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        variants = [('', body), ('.gz', gzip.compress(body, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(body)))
+        # Compressed variants first, so the proxy never pairs a new .gz with an old original
+        for suffix, data in reversed(variants):
+            tmp_path = f'{path}{suffix}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path + suffix)
+        return True
+
+    def remove(self, relative_path):
+        removed = False
+        for suffix in ('', '.gz', '.br'):
+            try:
+                os.remove(os.path.join(self.directory, relative_path + suffix))
+                removed = True
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def remove_stale_gallery_pages(self, club_id, kept):
+        """Drop gallery page files that are no longer among ``kept`` (the club shrank or is gone)"""
+        gallery_dir = os.path.join('api', 'club', str(club_id), 'gallery')
+        if not os.path.isdir(os.path.join(self.directory, gallery_dir)):
+            return 0
+        removed = 0
+        for name in os.listdir(os.path.join(self.directory, gallery_dir)):
+            relative_path = os.path.join(gallery_dir, name)
+            if name.endswith('.json') and relative_path not in kept:
+                removed += self.remove(relative_path)
+        return removed
+
+    def export(self, pages):
+        """Re-render ``pages``; pages that no longer render (deleted club) are removed"""
+        stats = {'written': 0, 'unchanged': 0, 'removed': 0}
+        with self.app.app_context():
+            targets = {page: self.targets(page) for page in sorted(pages)}
+
+        # Each render is a request of its own, with its own session
+        client = self.app.test_client()
+        for page, page_targets in targets.items():
+            kept = set()
+            gone = False
+            for url, relative_path in page_targets:
+                # Once the page itself is gone (e.g. a deleted club), so are its JSON variants
+                response = None if gone else client.get(url, environ_base={PRIMARY_ONLY_ENVIRON: True})
+                if response is not None and response.status_code == 200:
+                    changed = self.write(relative_path, response.get_data())
+                    stats['written' if changed else 'unchanged'] += 1
+                    kept.add(relative_path)
+                else:
+                    gone = gone or not kept
+                    stats['removed'] += self.remove(relative_path)
+            if page.startswith('club:'):
+                stats['removed'] += self.remove_stale_gallery_pages(page.split(':', 1)[1], kept)
+        logger.info(f"Static export of {len(pages)} page(s): {stats['written']} written, "
+                    f"{stats['unchanged']} unchanged, {stats['removed']} removed")
+        return stats
+
+    def export_all(self):
+        with self.app.app_context():
+            club_ids = [club_id for (club_id,) in Club.query.with_entities(Club.id)]
+        return self.export(set(STATIC_PAGES) | {f'club:{club_id}' for club_id in club_ids})
+
+    # ==================== POST-COMMIT HOOK ====================
+
+    def schedule(self, pages):
+        """Queue ``pages`` for a background export, merging with pages already queued"""
+        with self.lock:
+            queued = bool(self.pending)
+            self.pending |= set(pages)
+        if not queued:
+            self.executor.submit(self._drain)
+
+    def _drain(self):
+        with self.lock:
+            pages, self.pending = self.pending, set()
+        try:
+            self.export(pages)
+        except Exception as e:
+            logger.error(f"Static export failed: {str(e)}", exc_info=True)
+
+    def install_hooks(self, session_class):
+        """Re-export the pages touched by every committed flush of ``session_class``"""
+
+        @event.listens_for(session_class, 'after_flush')
+        def collect_changed_pages(session, flush_context):
+            pages = session.info.setdefault('static_export_pages', set())
+            for obj in list(session.new) + list(session.dirty):
+                pages |= pages_for_change(obj)
+            for obj in session.deleted:
+                pages |= pages_for_change(obj, deleted=True)
+
+        @event.listens_for(session_class, 'after_commit')
+        def export_changed_pages(session):
+            pages = session.info.pop('static_export_pages', None)
+            if pages:
+                self.schedule(pages)
+
+        @event.listens_for(session_class, 'after_rollback')
+        def discard_changed_pages(session):
+            session.info.pop('static_export_pages', None)
+
+if __name__ == '__main__':
+    from app import app, STATIC_EXPORT_DIR, GALLERY_PAGE_SIZE
+
+    exporter = StaticExporter(app, STATIC_EXPORT_DIR, GALLERY_PAGE_SIZE)
+    stats = exporter.export(set(sys.argv[1:])) if len(sys.argv) > 1 else exporter.export_all()
+    print(f"✓ {stats['written']} written, {stats['unchanged']} unchanged, {stats['removed']} removed "
+          f"-> {exporter.directory}")
@@ -0,0 +1,144 @@
+"""Chatbot transcripts and feedback, persisted off the request path.
+
+A chat request only puts its exchange on a bounded queue; one writer
+thread per worker drains it into multi-row INSERTs, a batch every
+``batch_size`` rows or ``flush_interval`` seconds. When the queue is
+full the newest rows are dropped and counted instead of slowing chat
+down, a batch the database refuses twice is dropped and counted, and on
+exit the writer gets ``shutdown_timeout`` seconds to flush what is left,
+so at most a queue's worth of rows can be lost.
+"""
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import insert
+from models import db, ChatTranscript, ChatFeedback
+
+logger = logging.getLogger(__name__)
+
+class TranscriptSink:
+    """Queues chat exchanges and feedback for the background writer"""
+
+    def __init__(self, app, queue_size=1000, batch_size=100, flush_interval=2.0, shutdown_timeout=5.0):
+        self.app = app
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.shutdown_timeout = shutdown_timeout
+        self.lock = threading.Lock()
+        self.closing = threading.Event()
+        self.writer = None
+        self.counts = {'queued': 0, 'written': 0, 'batches': 0, 'dropped': 0, 'failed': 0, 'lost': 0}
+
+    # ==================== REQUEST SIDE ====================
+
+    def _offer(self, model, row):
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait((model, row))
+            self.counts['queued'] += 1
+            return True
+        except queue.Full:
+            self.counts['dropped'] += 1
+            return False
+
+    def record_exchange(self, exchange_id, session_id, question, answer, path, latency_ms, usage=None):
+        """Queue one answered question; ``path`` says what produced the answer"""
+        usage = usage or {}
+        return self._offer(ChatTranscript, {
+            'exchange_id': exchange_id,
+            'session_id': session_id,
+            'question': question,
+            'answer': answer,
+            'path': path,
+            'latency_ms': int(latency_ms),
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens'),
+            'created_at': datetime.utcnow()
+        })
+
+    def record_feedback(self, exchange_id, session_id, rating, comment=None):
+        """Queue a +1/-1 rating of an exchange"""
+        return self._offer(ChatFeedback, {
+            'exchange_id': exchange_id,
+            'session_id': session_id,
+            'rating': rating,
+            'comment': comment,
+            'created_at': datetime.utcnow()
+        })
+
+    def stats(self):
+        return {**self.counts, 'queue_depth': self.queue.qsize()}
+
+    # ==================== WRITER ====================
+
+    def _ensure_writer(self):
+        # Started lazily so it lives in the worker process, not a pre-fork parent
+        if self.writer is not None and self.writer.is_alive():
+            return
+        with self.lock:
+            if self.writer is None or not self.writer.is_alive():
+                if self.writer is None:
+                    atexit.register(self.close)
+                self.writer = threading.Thread(target=self._write_forever, daemon=True, name='transcript-writer')
+                self.writer.start()
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if self.closing.is_set():
+                    batch.append(self.queue.get_nowait())
+                else:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_forever(self):
+        while not (self.closing.is_set() and self.queue.empty()):
+            try:
+                batch = self._next_batch()
+                if batch:
+                    self.write(batch)
+            except Exception as e:
+                logger.error(f"Transcript writer failed: {str(e)}", exc_info=True)
+
+    def write(self, batch):
+        """Insert ``(model, row)`` pairs, one multi-row INSERT per table in one transaction"""
+        tables = {}
+        for model, row in batch:
+            tables.setdefault(model, []).append(row)
+        for attempt in (1, 2):
+            try:
+                with self.app.app_context(), db.engine.begin() as conn:
+                    # Transcripts first, so feedback never lands before its exchange
+                    for model in (ChatTranscript, ChatFeedback):
+                        if model in tables:
+                            conn.execute(insert(model), tables[model])
+                self.counts['written'] += len(batch)
+                self.counts['batches'] += 1
+                return
+            except Exception as e:
+                if attempt == 2:
+                    self.counts['failed'] += len(batch)
+                    logger.error(f"Dropped {len(batch)} transcript rows: {str(e)}", exc_info=True)
+                else:
+                    time.sleep(self.flush_interval)
+
+    def close(self):
+        """Flush what is queued, waiting at most ``shutdown_timeout`` seconds (runs at exit)"""
+        self.closing.set()
+        if self.writer is not None:
+            self.writer.join(self.shutdown_timeout)
+        lost = self.queue.qsize()
+        if lost:
+            self.counts['lost'] += lost
+            logger.warning(f"Exiting with {lost} transcript rows unwritten")
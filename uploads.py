@@ -0,0 +1,207 @@
+import os
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+try:
+    # In requirements.txt: decoding, resizing and metadata stripping. Without
+    # it a file that only starts like an image could be served, so uploads
+    # are refused instead.
+    from PIL import Image, ImageOps
+    Image.MAX_IMAGE_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', 40_000_000))
+except ImportError:
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+# Bytes read before sniffing the type; the longest check (WebP) needs 12
+SNIFF_BYTES = 16
+
+# Leading bytes of the formats we accept, and the extension they are stored under
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+EXTENSIONS = ('png', 'jpg', 'gif', 'webp')
+
+def sniff_extension(head):
+    """Image type from the first bytes of a file, or None"""
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+class UploadRejected(Exception):
+    """An upload the request itself got wrong; ``status_code`` is the HTTP answer"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+class ImageUploads:
+    """Streams uploads to disk and names them by content hash.
+
+    The request only hashes and spools the bytes; decoding, validation and
+    resizing run on a small worker pool. A job's state lives on disk (the
+    spooled ``.part`` file, a ``.failed`` marker or the finished image), so
+    any worker can answer a status poll.
+    """
+
+    def __init__(self, images_dir, work_dir, max_bytes, max_dimension, workers=2):
+        self.images_dir = images_dir
+        self.work_dir = work_dir
+        self.max_bytes = max_bytes
+        self.max_dimension = max_dimension
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-upload')
+        self.lock = threading.Lock()
+        self.in_flight = set()
+        os.makedirs(images_dir, exist_ok=True)
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _paths(self, upload_id, extension):
+        filename = f'{upload_id}.{extension}'
+        return (filename,
+                os.path.join(self.work_dir, filename + '.part'),
+                os.path.join(self.images_dir, filename))
+
+    def _failed_marker(self, upload_id):
+        return os.path.join(self.work_dir, upload_id + '.failed')
+
+    # ==================== REQUEST SIDE ====================
+
+    def receive(self, stream, content_length=None):
+        """Spool ``stream`` to disk in chunks and queue it; returns the upload's status"""
+        if Image is None:
+            raise UploadRejected('Image uploads are unavailable: Pillow is not installed', 503)
+        if content_length is not None and content_length > self.max_bytes:
+            raise UploadRejected(self.too_large_message(), 413)
+
+        spool_path = os.path.join(self.work_dir, f'{uuid.uuid4().hex}.tmp')
+        digest = hashlib.sha256()
+        size = 0
+        head = b''
+        extension = None
+        try:
+            with open(spool_path, 'wb') as f:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadRejected(self.too_large_message(), 413)
+                    digest.update(chunk)
+                    f.write(chunk)
+                    # A chunk can be shorter than a signature: sniff once enough has arrived
+                    if extension is None and len(head) < SNIFF_BYTES:
+                        head += chunk[:SNIFF_BYTES - len(head)]
+                        if len(head) == SNIFF_BYTES:
+                            extension = self._require_image(head)
+            if size == 0:
+                raise UploadRejected('Empty upload')
+            if extension is None:
+                extension = self._require_image(head)
+        except BaseException:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+            raise
+
+        # 16 hex digits of SHA-256: unique in practice and recognised as a
+        # hashed name by the image cache headers
+        upload_id = digest.hexdigest()[:16]
+        filename, part_path, final_path = self._paths(upload_id, extension)
+        if os.path.exists(final_path):
+            os.remove(spool_path)
+            return self.describe(upload_id, 'ready', filename, deduplicated=True)
+
+        os.replace(spool_path, part_path)
+        try:
+            os.remove(self._failed_marker(upload_id))
+        except FileNotFoundError:
+            pass
+        with self.lock:
+            queued = upload_id in self.in_flight
+            self.in_flight.add(upload_id)
+        if not queued:
+            self.executor.submit(self._process, upload_id, extension)
+        logger.info(f"Queued image upload {filename} ({size} bytes)")
+        return self.describe(upload_id, 'processing', filename)
+
+    def status(self, upload_id):
+        """Status of an upload by id, or None when it is unknown"""
+        for extension in EXTENSIONS:
+            filename, part_path, final_path = self._paths(upload_id, extension)
+            if os.path.exists(final_path):
+                return self.describe(upload_id, 'ready', filename)
+            if os.path.exists(part_path):
+                return self.describe(upload_id, 'processing', filename)
+        try:
+            with open(self._failed_marker(upload_id)) as f:
+                return self.describe(upload_id, 'failed', None, error=f.read())
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _require_image(head):
+        extension = sniff_extension(head)
+        if extension is None:
+            raise UploadRejected('Only PNG, JPEG, GIF and WebP images are accepted', 415)
+        return extension
+
+    def too_large_message(self):
+        return f'Image is larger than {self.max_bytes / (1024 * 1024):.3g} MB'
+
+    @staticmethod
+    def describe(upload_id, status, filename, **extra):
+        return {'id': upload_id, 'status': status, 'filename': filename, **extra}
+
+    # ==================== WORKER SIDE ====================
+
+    def _process(self, upload_id, extension):
+        filename, part_path, final_path = self._paths(upload_id, extension)
+        try:
+            if os.path.exists(final_path):
+                # Another worker finished the same content first
+                os.remove(part_path)
+                return
+            self._normalize(part_path, extension)
+            shutil.move(part_path, final_path)
+            logger.info(f"Image upload {filename} ready")
+        except FileNotFoundError:
+            if not os.path.exists(final_path):
+                logger.error(f"Image upload {filename} vanished while processing")
+        except Exception as e:
+            logger.error(f"Image upload {filename} failed: {str(e)}", exc_info=True)
+            with open(self._failed_marker(upload_id), 'w') as f:
+                f.write('The file could not be read as an image')
+            try:
+                os.remove(part_path)
+            except FileNotFoundError:
+                pass
+        finally:
+            with self.lock:
+                self.in_flight.discard(upload_id)
+
+    def _normalize(self, path, extension):
+        """Decode fully, apply EXIF rotation, cap the size and drop metadata (in place)"""
+        with Image.open(path) as image:
+            image.verify()
+        with Image.open(path) as image:
+            if getattr(image, 'is_animated', False):
+                return
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((self.max_dimension, self.max_dimension))
+            options = {'png': {'optimize': True},
+                       'jpg': {'quality': 85, 'optimize': True, 'progressive': True},
+                       'webp': {'quality': 85},
+                       'gif': {}}[extension]
+            if extension == 'jpg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            tmp_path = path + '.tmp'
+            image.save(tmp_path, format={'jpg': 'JPEG'}.get(extension, extension.upper()), **options)
+        os.replace(tmp_path, path)